@@ -0,0 +1,64 @@
+import math
+from scipy import stats
+from streaming import RunningStats
+
+# Sequential stopping for replicated simulations. Replicates are added in
+# batches until every tracked statistic's confidence interval half-width is
+# within the target fraction of its mean, or a replicate cap is reached.
+
+EVERY_MEAN = 'Mean of every discipline'
+METRICS = ('Completion Time', 'Waiting Time')
+
+
+def half_width(running, confidence=0.95):
+    if running.count < 2:
+        return math.inf
+    return stats.t.ppf(0.5 + confidence / 2, running.count - 1) * math.sqrt(running.variance / running.count)
+
+
+def relative_half_width(running, confidence=0.95):
+    if running.mean == 0:
+        return 0.0 if half_width(running, confidence) == 0 else math.inf
+    return half_width(running, confidence) / abs(running.mean)
+
+
+def target_choices(names):
+    # EVERY_MEAN, or the paired difference of two disciplines on the same replicates
+    return [EVERY_MEAN] + [f'{a} - {b}' for i, a in enumerate(names) for b in names[i + 1:]]
+
+
+def statistics_for(names, choice):
+    # Maps each tracked statistic to a function of one replicate's {discipline: value}
+    if choice == EVERY_MEAN:
+        return {name: (lambda values, name=name: values[name]) for name in names}
+    a, b = choice.split(' - ')
+    return {choice: lambda values: values[a] - values[b]}
+
+
+def run_sequential(sample, statistics, target, confidence=0.95, batch_size=10, min_replicates=10, max_replicates=1000, antithetic=False,
+                   progress=None, cancelled=None):
+    # sample(first, count) returns the observations of replicates first .. first + count - 1.
+    # With antithetic twins (2k, 2k + 1) each pair's mean is one observation, since
+    # the twins are deliberately correlated; batches are rounded up to whole pairs.
+    # A target of None runs all max_replicates. progress(running, replicates) is
+    # called after every batch, and a true cancelled() stops before the next one.
+    if antithetic:
+        batch_size += batch_size % 2
+    running = {name: RunningStats() for name in statistics}
+    twin = None
+    replicates = 0
+    while replicates < max_replicates and not (cancelled is not None and cancelled()):
+        count = min(batch_size, max_replicates - replicates)
+        for values in sample(replicates, count):
+            if antithetic and twin is None:
+                twin = values
+                continue
+            for name, statistic in statistics.items():
+                running[name].add(statistic(values) if twin is None else (statistic(twin) + statistic(values)) / 2)
+            twin = None
+        replicates += count
+        if progress is not None:
+            progress(running, replicates)
+        if target is not None and replicates >= min_replicates and all(relative_half_width(r, confidence) <= target for r in running.values()):
+            return running, replicates, True
+    return running, replicates, False
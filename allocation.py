@@ -0,0 +1,345 @@
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from ortools.linear_solver import pywraplp
+from ortools.sat.python import cp_model
+
+# Reusable user/load/machine allocation model for max_users.py and modelling.py.
+# The variables and constraints only depend on the instance size, so they are
+# built once and each replicate just updates the objective and re-solves.
+# Every solve returns (status, objective, bound, assigned (u, j, l) keys), with
+# status a pywraplp.Solver code whichever solver ran.
+
+CAPACITY_PER_MACHINE = 'machine'  # max_users.py: at most one load per machine
+CAPACITY_PER_MACHINE_USER = 'machine_user'  # modelling.py: at most one load per user on each machine
+
+BACKENDS = ('auto', 'flow', 'scip')
+OBJECTIVES = ('count', 'completion_time')
+
+# Default wall-clock limit for completion time schedules, in seconds
+SCHEDULE_TIME_LIMIT = 10
+
+# CP-SAT statuses in pywraplp terms; the two enums reuse the same integers for different outcomes
+CP_SAT_STATUS = {
+    cp_model.OPTIMAL: pywraplp.Solver.OPTIMAL,
+    cp_model.FEASIBLE: pywraplp.Solver.FEASIBLE,
+    cp_model.INFEASIBLE: pywraplp.Solver.INFEASIBLE,
+    cp_model.MODEL_INVALID: pywraplp.Solver.MODEL_INVALID,
+    cp_model.UNKNOWN: pywraplp.Solver.NOT_SOLVED,
+}
+
+
+def capacity_groups(users, loads, machines, capacity):
+    # Each group is one "at most one of these variables" constraint
+    if capacity == CAPACITY_PER_MACHINE:
+        return [[(u, j, l) for u in users for l in loads] for j in machines]
+    if capacity == CAPACITY_PER_MACHINE_USER:
+        return [[(u, j, l) for l in loads] for j in machines for u in users]
+    raise ValueError(f"Invalid capacity structure: {capacity}")
+
+
+def resolve_backend(backend, groups):
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid backend: {backend}")
+    if backend == 'scip':
+        return backend
+    # The flow network only exists when no variable sits in two capacity constraints
+    seen = set()
+    for group in groups:
+        for key in group:
+            if key in seen:
+                if backend == 'flow':
+                    raise ValueError("Capacity constraints overlap; the model is not a flow problem")
+                return 'scip'
+            seen.add(key)
+    return 'flow'
+
+
+def solve_flow(groups, coefficients):
+    # Source -> capacity group (capacity 1) -> variable -> sink. The groups are
+    # disjoint, so the network splits into one star per group and its min-cost
+    # flow sends each unit through the most valuable arc, reaching the MIP's
+    # objective. Ties go to the first variable of the group, which is usually
+    # but not always the one SCIP picks, so allocations can differ between
+    # equally valuable loads. Variables worth zero are never assigned: either
+    # value is optimal for them, and SCIP leaves them at 0 in practice.
+    assigned = []
+    objective = 0.0
+    for group in groups:
+        best = None
+        for u, j, l in group:
+            if coefficients[u, l] > 0 and (best is None or coefficients[u, l] > best_value):
+                best, best_value = (u, j, l), coefficients[u, l]
+        if best is not None:
+            assigned.append(best)
+            objective += best_value
+    return pywraplp.Solver.OPTIMAL, objective, objective, assigned
+
+
+class FlowValue:
+    # Stands in for an OR-Tools variable, so flow results keep the (solver, x) interface
+    def __init__(self, value):
+        self.value = value
+
+    def solution_value(self):
+        return self.value
+
+
+class FlowObjective:
+    def __init__(self, value, bound):
+        self.value = value
+        self.bound = bound
+
+    def Value(self):
+        return self.value
+
+    def BestBound(self):
+        return self.bound
+
+
+class FlowSolver:
+    # Stands in for a solved pywraplp.Solver: the status and objective read back like SCIP's
+    def __init__(self, status, objective, bound):
+        self.status = status
+        self.objective = FlowObjective(objective, bound)
+
+    def Solve(self):
+        return self.status
+
+    def Objective(self):
+        return self.objective
+
+
+def flow_solution(users, loads, machines, groups, coefficients):
+    # solve_flow as the (solver, x) pair a SCIP model returns, with every variable in x
+    status, objective, bound, assigned = solve_flow(groups, coefficients)
+    x = {(u, j, l): FlowValue(0.0) for u in users for l in loads for j in machines}
+    for key in assigned:
+        x[key].value = 1.0
+    return FlowSolver(status, objective, bound), x
+
+
+class AllocationModel:
+    def __init__(self, users, loads, machines, capacity, num_threads=1, time_limit=None, backend='auto'):
+        self.users = users
+        self.loads = loads
+        self.machines = machines
+        self.groups = capacity_groups(users, loads, machines, capacity)
+        self.backend = resolve_backend(backend, self.groups)
+        self.coefficients = dict.fromkeys(((u, l) for u in users for l in loads), 1)
+        if self.backend == 'flow':
+            return
+
+        self.solver = pywraplp.Solver.CreateSolver('SCIP')
+        self.solver.SetNumThreads(num_threads)
+        if time_limit is not None:
+            self.solver.SetTimeLimit(int(time_limit * 1000))  # OR-Tools takes milliseconds
+
+        # Unnamed variables and coefficient-wise constraints avoid building
+        # formatted names and Python sum() expressions for every replicate
+        self.x = {}
+        for u in users:
+            for l in loads:
+                for j in machines:
+                    self.x[u, j, l] = self.solver.BoolVar('')
+
+        for group in self.groups:
+            constraint = self.solver.Constraint(0, 1)
+            for key in group:
+                constraint.SetCoefficient(self.x[key], 1)
+
+        self.objective = self.solver.Objective()
+        self.objective.SetMaximization()
+        self.set_objective(self.coefficients)
+
+    def set_objective(self, coefficients):
+        # coefficients maps (user, load) to the value of allocating that load
+        self.coefficients = coefficients
+        if self.backend == 'flow':
+            return
+        for (u, j, l), var in self.x.items():
+            self.objective.SetCoefficient(var, coefficients[u, l])
+
+    def solve(self, processing_times, coefficients=None):
+        # The allocation objective counts loads, so processing_times only matter
+        # to callers that pass per-replicate coefficients derived from them
+        if coefficients is not None:
+            self.set_objective(coefficients)
+        if self.backend == 'flow':
+            return solve_flow(self.groups, self.coefficients)
+        status = self.solver.Solve()
+        # Only the assigned (u, j, l) keys are returned, in capacity group order like solve_flow
+        assigned = [key for group in self.groups for key in group if self.x[key].solution_value() > 0.5]
+        return status, self.objective.Value(), self.objective.BestBound(), assigned
+
+
+def wspt_schedule(jobs, processing_times, weights, machines):
+    # Weighted shortest processing time list schedule: each job, by p/w, goes
+    # to the machine that frees up first
+    machine_free = dict.fromkeys(machines, 0)
+    schedule = {j: [] for j in machines}
+    objective = 0
+    for job in sorted(jobs, key=lambda job: processing_times[job] / weights[job]):
+        j = min(machines, key=machine_free.get)
+        machine_free[j] += processing_times[job]
+        schedule[j].append(job)
+        objective += weights[job] * machine_free[j]
+    return objective, schedule
+
+
+def completion_time_lower_bound(jobs, processing_times, weights, num_machines):
+    # Eastman, Even and Isaacs: the single machine WSPT optimum run m times
+    # faster, plus the (m - 1) / 2m share of every job's own weighted length
+    single_machine, _ = wspt_schedule(jobs, processing_times, weights, [None])
+    own_length = sum(weights[job] * processing_times[job] for job in jobs)
+    return single_machine / num_machines + (num_machines - 1) / (2 * num_machines) * own_length
+
+
+def minimize_completion_time(users, loads, machines, processing_times, weights=None, time_limit=None, num_threads=1):
+    # Total (weighted) completion time on identical parallel machines. The WSPT
+    # list schedule is the starting incumbent and CP-SAT improves it within the
+    # time limit, so a day with hundreds of loads always returns on time.
+    jobs = [(u, l) for u in users for l in loads]
+    weights = weights or dict.fromkeys(jobs, 1)
+    time_limit = SCHEDULE_TIME_LIMIT if time_limit is None else time_limit
+    objective, schedule = wspt_schedule(jobs, processing_times, weights, machines)
+    bound = completion_time_lower_bound(jobs, processing_times, weights, len(machines))
+
+    model = cp_model.CpModel()
+    horizon = sum(processing_times[job] for job in jobs)
+    starts = {}
+    ends = {}
+    present = {}
+    machine_intervals = {j: [] for j in machines}
+    for job in jobs:
+        starts[job] = model.NewIntVar(0, horizon, '')
+        ends[job] = model.NewIntVar(0, horizon, '')
+        for j in machines:
+            present[job, j] = model.NewBoolVar('')
+            interval = model.NewOptionalIntervalVar(starts[job], processing_times[job], ends[job], present[job, j], '')
+            machine_intervals[j].append(interval)
+        model.AddExactlyOne(present[job, j] for j in machines)
+    for j in machines:
+        model.AddNoOverlap(machine_intervals[j])
+    model.Minimize(sum(weights[job] * ends[job] for job in jobs))
+
+    # Hint the WSPT incumbent
+    for j in machines:
+        clock = 0
+        for job in schedule[j]:
+            model.AddHint(starts[job], clock)
+            clock += processing_times[job]
+    for job, j in present:
+        model.AddHint(present[job, j], job in schedule[j])
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = num_threads
+    status = solver.Solve(model)
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        bound = max(bound, solver.BestObjectiveBound())
+        if solver.ObjectiveValue() < objective:
+            objective = solver.ObjectiveValue()
+            schedule = {j: sorted((job for job in jobs if solver.Value(present[job, j])), key=lambda job: solver.Value(starts[job])) for j in machines}
+        if status == cp_model.FEASIBLE and objective <= bound:
+            status = cp_model.OPTIMAL
+    elif status != cp_model.UNKNOWN:
+        # INFEASIBLE or MODEL_INVALID: the model is broken, so no schedule is reported
+        return CP_SAT_STATUS[status], None, None, []
+    elif objective <= bound:
+        status = cp_model.OPTIMAL
+    else:
+        status = cp_model.FEASIBLE  # Out of time: the WSPT incumbent is the only schedule
+
+    # Loads on a machine are listed in start order, so assignment_rows recovers the starts
+    assigned = [(u, j, l) for j in machines for u, l in schedule[j]]
+    return CP_SAT_STATUS[status], objective, bound, assigned
+
+
+RESULT_COLUMNS = ['Replicate', 'User', 'Load', 'Machine', 'Start']
+
+
+def assignment_rows(replicate, assigned, processing_times):
+    # Long format: one row per assigned load. Loads sharing a machine run back
+    # to back in assignment order.
+    machine_free = {}
+    rows = []
+    for u, j, l in assigned:
+        start = machine_free.get(j, 0)
+        machine_free[j] = start + processing_times[u, l]
+        rows.append((replicate, u, l, j, start))
+    return rows
+
+
+worker_model = None
+
+
+def init_worker(users, loads, machines, capacity, num_threads, time_limit, backend):
+    global worker_model
+    worker_model = AllocationModel(users, loads, machines, capacity, num_threads, time_limit, backend)
+
+
+def solve_in_worker(processing_times, coefficients=None):
+    return worker_model.solve(processing_times, coefficients)
+
+
+def solve_batch(users, loads, machines, capacity, replicates, max_workers=1, num_threads=1, time_limit=None, backend='auto', objective='count',
+                coefficients=None):
+    # coefficients optionally gives each replicate's allocation values, in replicate order
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Invalid objective: {objective}")
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(replicates) // (max_workers * 4))
+    if objective == 'completion_time':
+        # Schedules ignore the capacity structure and share no model between replicates
+        solve = partial(minimize_completion_time, users, loads, machines, time_limit=time_limit, num_threads=num_threads)
+        if max_workers == 1:
+            return [solve(processing_times) for processing_times in replicates]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(solve, replicates, chunksize=chunksize))
+
+    # One model per process, reused for every replicate that process solves
+    if max_workers == 1:
+        model = AllocationModel(users, loads, machines, capacity, num_threads, time_limit, backend)
+        return [model.solve(*args) for args in zip(replicates, coefficients or [None] * len(replicates))]
+
+    initargs = (users, loads, machines, capacity, num_threads, time_limit, backend)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker, initargs=initargs) as executor:
+        return list(executor.map(solve_in_worker, replicates, coefficients or [None] * len(replicates), chunksize=chunksize))
+
+
+def benchmark(sizes, capacity=CAPACITY_PER_MACHINE, replicates=5):
+    # Wall time per backend for growing users x loads x machines, each replicate
+    # valuing its loads at random. The two backends must reach the same
+    # objective on every replicate; identical reports whether the allocations
+    # themselves agree too.
+    rows = []
+    for num_users, num_loads, num_machines in sizes:
+        users = [f'User{i+1}' for i in range(num_users)]
+        loads = [f'Load{j+1}' for j in range(num_loads)]
+        machines = [f'Machine{k+1}' for k in range(num_machines)]
+        data = [{(u, l): random.randint(1, 10) for u in users for l in loads} for _ in range(replicates)]
+        times = {}
+        solutions = {}
+        for backend in ('scip', 'flow'):
+            start = time.perf_counter()
+            solutions[backend] = solve_batch(users, loads, machines, capacity, data, backend=backend, coefficients=data)
+            times[backend] = time.perf_counter() - start
+        for scip, flow in zip(solutions['scip'], solutions['flow']):
+            if abs(scip[1] - flow[1]) > 1e-6:
+                raise AssertionError(f"Flow objective {flow[1]} differs from SCIP's {scip[1]}")
+        identical = all(scip[3] == flow[3] for scip, flow in zip(solutions['scip'], solutions['flow']))
+        rows.append((num_users * num_loads * num_machines, times['scip'], times['flow'], identical))
+    return rows
+
+
+if __name__ == "__main__":
+    # python allocation.py [machine|machine_user]
+    capacity = sys.argv[1] if len(sys.argv) > 1 else CAPACITY_PER_MACHINE
+    sizes = [(5, 2, 2), (10, 5, 5), (20, 10, 10), (40, 10, 20), (50, 20, 20)]
+    print(f"{'variables':>10} {'scip (s)':>10} {'flow (s)':>10} {'speedup':>8} identical")
+    for variables, scip_time, flow_time, identical in benchmark(sizes, capacity):
+        print(f"{variables:>10} {scip_time:>10.3f} {flow_time:>10.3f} {scip_time / flow_time:>8.1f} {identical}")
@@ -0,0 +1,83 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+
+# Background runs for the Streamlit pages. A run executes work(run) on a shared
+# thread pool; the work publishes a snapshot of its partial results after every
+# batch and checks run.cancelled() between batches. The page draws the latest
+# snapshot from a polling fragment, so the script thread never waits on the
+# simulation and a Cancel button stays live.
+
+POLL_SECONDS = 0.5
+
+
+class BackgroundRun:
+    def __init__(self, key):
+        self.key = key  # The inputs the run was started for
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.state = None
+        self.future = None
+
+    def publish(self, state):
+        with self.lock:
+            self.state = state
+
+    def snapshot(self):
+        with self.lock:
+            return self.state
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def running(self):
+        return not self.future.done()
+
+
+@st.cache_resource
+def get_executor():
+    # Shared by every session; the processes behind montecarlo are separate
+    return ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+
+
+def start(key, work):
+    # work(run) returns the final snapshot, which is published when it finishes
+    run = BackgroundRun(key)
+    run.future = get_executor().submit(lambda: run.publish(work(run)))
+    return run
+
+
+def session_run(name, key, work):
+    # The session's run for these inputs. Changed inputs cancel the old run and start afresh.
+    run = st.session_state.get(name)
+    if run is None or run.key != key:
+        if run is not None:
+            run.cancel()
+        run = start(key, work)
+        st.session_state[name] = run
+    return run
+
+
+def show(run, render):
+    # render(state, finished) draws a snapshot; state is None until the first batch is in
+    running = run.running()
+
+    @st.fragment(run_every=POLL_SECONDS if running else None)
+    def results():
+        if running and not run.running():
+            st.rerun()  # Finished since the last poll: redraw the page once, without polling
+        if run.running():
+            if st.button('Cancel', disabled=run.cancelled(), key=f'cancel-{id(run)}'):  # A page may show several runs
+                run.cancel()
+        elif run.future.exception() is not None:
+            st.exception(run.future.exception())
+            return
+        if run.cancelled():
+            st.warning('Cancelled' if not run.running() else 'Cancelling after the current batch')
+        render(run.snapshot(), not run.running())
+
+    results()
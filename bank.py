@@ -1,9 +1,18 @@
 import streamlit as st
 import numpy as np
+import pandas as pd
 import itertools
+import os
 import simpy
 import random
 from collections import deque
+import adaptive
+import background
+import engine
+import optimal
+import surrogate
+import variance
+from taskstore import TaskStore, engine_columns
 
 class Task:
     def __init__(self, task_id, arrival_time, completion_time):
@@ -16,17 +25,52 @@ class Task:
     def __repr__(self):
         return f"Task {self.task_id} (Arrival: {self.arrival_time}, Duration: {self.completion_time})"
 
-def generate_tasks_poisson(num_tasks, arrival_rate, mean, std_dev):
-    tasks = []
+def iter_tasks_poisson(arrival_rate, mean, std_dev, rng=None):
+    # Unbounded lazy arrival stream; see streaming.simulate_stream
+    rng = np.random if rng is None else rng  # Global state unless a seeded Generator is passed
     arrival_time = 0
-    for i in range(num_tasks):
-        arrival_time += np.random.exponential(arrival_rate)
-        duration = max(int(np.random.normal(mean, std_dev)), 1)  # Ensure duration is at least 1
-        task = Task(task_id=i + 1, arrival_time=arrival_time, completion_time=duration)
-        tasks.append(task)
-    return tasks
-
-def compute_completion_time(env, tasks):
+    for i in itertools.count():
+        arrival_time += rng.exponential(arrival_rate)
+        duration = max(int(rng.normal(mean, std_dev)), 1)  # Ensure duration is at least 1
+        yield Task(task_id=i + 1, arrival_time=arrival_time, completion_time=duration)
+
+def generate_tasks_poisson(num_tasks, arrival_rate, mean, std_dev, rng=None):
+    return list(itertools.islice(iter_tasks_poisson(arrival_rate, mean, std_dev, rng), num_tasks))
+
+def generate_task_matrices_poisson(num_simulations, num_tasks, arrival_rate, mean, std_dev, rng=None):
+    # Same distributions as generate_tasks_poisson, one row per replicate
+    rng = np.random if rng is None else rng
+    arrival_times = np.cumsum(rng.exponential(arrival_rate, size=(num_simulations, num_tasks)), axis=1)
+    durations = np.maximum(rng.normal(mean, std_dev, size=(num_simulations, num_tasks)).astype(int), 1)
+    return arrival_times, durations
+
+def generate_task_stores_poisson(num_simulations, num_tasks, arrival_rate, mean, std_dev, rng=None):
+    arrival_times, durations = generate_task_matrices_poisson(num_simulations, num_tasks, arrival_rate, mean, std_dev, rng)
+    return [TaskStore.from_arrays(arrival_times[sim], durations[sim]) for sim in range(num_simulations)]
+
+# The compute_* functions take backend='heap' (engine.py, tasks returned in
+# completion order) or backend='simpy' (the original SimPy models, tasks returned
+# in input order). The two are not interchangeable: SimPy SJF dispatches in
+# arrival order and SimPy SRTN preempts in 1-unit slices, so only FCFS and HRRN
+# totals agree. The page and montecarlo run the heap engine; the SimPy paths are
+# kept for benchmark.py.
+def compute_completion_time_with_engine(tasks, discipline):
+    arrivals, durations = engine_columns(tasks)
+    starts, ends, order = engine.simulate(arrivals, durations, discipline)
+    if isinstance(tasks, TaskStore):
+        tasks.start[:] = starts
+        tasks.end[:] = ends
+        return sum(end - arrival for end, arrival in zip(ends, arrivals)), [tasks[i] for i in order]
+    total_completion_time = 0
+    for i, task in enumerate(tasks):
+        task.start_time = starts[i]
+        task.end_time = ends[i]
+        total_completion_time += ends[i] - task.arrival_time
+    return total_completion_time, [tasks[i] for i in order]
+
+def compute_completion_time(env, tasks, backend='simpy'):
+    if backend == 'heap':
+        return compute_completion_time_with_engine(tasks, 'FCFS')
     machine = simpy.Resource(env, capacity=1)
     completion_times = []
 
@@ -46,20 +90,28 @@ def compute_completion_time(env, tasks):
     total_completion_time = sum(completion_times)
     return total_completion_time, tasks
 
-def find_minimum_completion_time_with_brute_force(tasks):
+def find_minimum_completion_time_with_brute_force(tasks, backend='simpy'):
     min_completion_time = float('inf')
     min_permutation = None
 
     for permutation in itertools.permutations(tasks):
         env = simpy.Environment()
-        completion_time, _ = compute_completion_time(env, list(permutation))
+        completion_time, _ = compute_completion_time(env, list(permutation), backend)
         if completion_time < min_completion_time:
             min_completion_time = completion_time
             min_permutation = permutation
 
     return min_completion_time, min_permutation
 
-def compute_fcfs_completion_time_with_simpy(env, tasks):
+def find_minimum_completion_time_exact(tasks):
+    # Branch-and-bound over service sequences instead of every permutation
+    arrivals, durations = engine_columns(tasks)
+    min_completion_time, order = optimal.optimal_sequence(arrivals, durations)
+    return min_completion_time, tuple(tasks[i] for i in order)
+
+def compute_fcfs_completion_time_with_simpy(env, tasks, backend='simpy'):
+    if backend == 'heap':
+        return compute_completion_time_with_engine(tasks, 'FCFS')
     machine = simpy.Resource(env, capacity=1)
     completion_times = []
 
@@ -79,7 +131,9 @@ def compute_fcfs_completion_time_with_simpy(env, tasks):
     total_completion_time = sum(completion_times)
     return total_completion_time, tasks
 
-def compute_sjf_completion_time_with_simpy(env, tasks):
+def compute_sjf_completion_time_with_simpy(env, tasks, backend='simpy'):
+    if backend == 'heap':
+        return compute_completion_time_with_engine(tasks, 'SJF')
     machine = simpy.Resource(env, capacity=1)
     completion_times = []
     sorted_tasks = sorted(tasks, key=lambda task: (task.arrival_time, task.completion_time))
@@ -100,7 +154,9 @@ def compute_sjf_completion_time_with_simpy(env, tasks):
     total_completion_time = sum(completion_times)
     return total_completion_time, sorted_tasks
 
-def compute_srtn_completion_time_with_simpy(env, tasks):
+def compute_srtn_completion_time_with_simpy(env, tasks, backend='simpy'):
+    if backend == 'heap':
+        return compute_completion_time_with_engine(tasks, 'SRTN')
     machine = simpy.Resource(env, capacity=1)
     remaining_times = {task.task_id: task.completion_time for task in tasks}
     task_queue = deque()  # Initialize task queue
@@ -110,10 +166,16 @@ def compute_srtn_completion_time_with_simpy(env, tasks):
         yield env.timeout(task.arrival_time)
         task_queue.append(task)  # Add task to the queue
         while task_queue:
-            task_queue = deque(sorted(task_queue, key=lambda t: remaining_times[t.task_id]))
-            current_task = task_queue.popleft()
             with machine.request() as request:
                 yield request
+                if not task_queue:
+                    break
+                # Chosen once the machine is free, so tasks arriving meanwhile compete.
+                # Reordered in place: the queue is shared by every task process.
+                ordered = sorted(task_queue, key=lambda t: remaining_times[t.task_id])
+                task_queue.clear()
+                task_queue.extend(ordered)
+                current_task = task_queue.popleft()
                 run_time = min(1, remaining_times[current_task.task_id])
                 yield env.timeout(run_time)
                 remaining_times[current_task.task_id] -= run_time
@@ -121,6 +183,8 @@ def compute_srtn_completion_time_with_simpy(env, tasks):
                     current_task.end_time = env.now
                     completion_times.append(current_task.end_time - current_task.arrival_time)
                     remaining_times.pop(current_task.task_id)
+                else:
+                    task_queue.append(current_task)  # Back in line for its next slice
 
     for task in tasks:
         env.process(task_process(env, task, machine))
@@ -129,26 +193,34 @@ def compute_srtn_completion_time_with_simpy(env, tasks):
     total_completion_time = sum(completion_times)
     return total_completion_time, tasks
 
-def compute_hrrn_completion_time_with_simpy(env, tasks):
+def compute_hrrn_completion_time_with_simpy(env, tasks, backend='simpy'):
+    if backend == 'heap':
+        return compute_completion_time_with_engine(tasks, 'HRRN')
     machine = simpy.Resource(env, capacity=1)
     remaining_times = {task.task_id: task.completion_time for task in tasks}
     arrival_times = {task.task_id: task.arrival_time for task in tasks}
     task_queue = deque()  # Initialize task queue
     completion_times = []
 
+    def response_ratio(t):
+        waiting_time = env.now - arrival_times[t.task_id]
+        return (waiting_time + remaining_times[t.task_id]) / remaining_times[t.task_id]
+
     def task_process(env, task, machine):
         yield env.timeout(task.arrival_time)
         task_queue.append(task)  # Add task to the queue
         while task_queue:
-            for t in task_queue:
-                waiting_time = env.now - arrival_times[t.task_id]
-                response_ratio = (waiting_time + remaining_times[t.task_id]) / remaining_times[t.task_id]
-                t.response_ratio = response_ratio
-
-            task_queue = deque(sorted(task_queue, key=lambda t: t.response_ratio, reverse=True))
-            current_task = task_queue.popleft()
             with machine.request() as request:
                 yield request
+                if not task_queue:
+                    break
+                # Chosen once the machine is free, with ratios computed in the sort key
+                # rather than stored on the tasks. Reordered in place: the queue is
+                # shared by every task process.
+                ordered = sorted(task_queue, key=response_ratio, reverse=True)
+                task_queue.clear()
+                task_queue.extend(ordered)
+                current_task = task_queue.popleft()
                 current_task.start_time = env.now
                 yield env.timeout(current_task.completion_time)
                 current_task.end_time = env.now
@@ -162,6 +234,30 @@ def compute_hrrn_completion_time_with_simpy(env, tasks):
     total_completion_time = sum(completion_times)
     return total_completion_time, tasks
 
+@st.cache_resource
+def get_surrogate(modified):
+    # Keyed on the model file's modification time, so a retrained model is picked up
+    return surrogate.Surrogate.load() if modified is not None else None
+
+def simulate_estimates(run, names, num_tasks, arrival_rate, mean, std_dev):
+    # Fallback for the disciplines the surrogate cannot vouch for: the page's own
+    # montecarlo replicates, reported as (mean, 95% half-width) after every batch
+    import montecarlo  # Imported lazily: montecarlo imports this module
+
+    def waiting_estimates(state):
+        running = state[3]
+        return {name: (running[name].mean, adaptive.half_width(running[name]), 'simulation') for name in names if running[name].count}
+
+    state = montecarlo.run_adaptive_simulations(num_tasks, arrival_rate, mean, std_dev, None, adaptive.EVERY_MEAN, 'Waiting Time', seed=0,
+                                                max_simulations=surrogate.FALLBACK_REPLICATES, batch_size=20,
+                                                progress=lambda state: run.publish(waiting_estimates(state)), cancelled=run.cancelled)
+    return waiting_estimates(state)
+
+def show_estimates(estimates, names):
+    # Disciplines still being simulated are listed without a value
+    rows = {name: estimates.get(name, (None, None, 'simulating...')) for name in names}
+    st.table(pd.DataFrame(rows, index=["Avg Waiting Time", "95% Half-Width", "Source"]).T)
+
 def main():
     st.title("Dynamic Task Scheduling and Completion Time Analysis with SimPy")
 
@@ -170,59 +266,98 @@ def main():
     mean = st.number_input("Mean of Completion Time", value=5)
     std_dev = st.number_input("Standard Deviation of Completion Time", value=2)
     time_slice = st.number_input("Time Slice for Round Robin", min_value=1, value=1)
-    num_simulations = st.number_input("Number of Simulations", min_value=1, value=100)
+    adaptive_replication = st.checkbox("Adaptive Number of Simulations")
+    if adaptive_replication:
+        # Simulations are added in batches until the confidence interval is narrow enough
+        target = st.number_input("Target Relative Half-Width", min_value=0.001, max_value=1.0, value=0.05)
+        target_metric = st.selectbox("Target Metric", adaptive.METRICS)
+        target_choice = st.selectbox("Precision Target", adaptive.target_choices(['FCFS', 'SJF', 'SRTN', 'HRRN']))
+        batch_size = st.number_input("Simulations per Batch", min_value=1, value=20)
+        max_simulations = st.number_input("Maximum Number of Simulations", min_value=1, value=2000)
+    else:
+        num_simulations = st.number_input("Number of Simulations", min_value=1, value=100)
+    # Twins 2k and 2k + 1 are drawn from mirrored uniforms
+    antithetic = st.checkbox("Antithetic Replicates")
+    seed = st.number_input("Random Seed", min_value=0, value=0)
+
+    # Instant estimates from the trained surrogate; points it cannot vouch for are simulated in the background
+    st.subheader("Average Waiting Time Estimate")
+    modified = os.path.getmtime(surrogate.MODEL_FILE) if os.path.exists(surrogate.MODEL_FILE) else None
+    model = get_surrogate(modified)
+    names = ['FCFS', 'SJF', 'SRTN', 'HRRN']
+    estimates = {}
+    for name in names:
+        predicted = surrogate.trusted_prediction(model, name, num_tasks, 1, arrival_rate, mean, std_dev)
+        if predicted is not None:
+            estimates[name] = (*predicted, 'surrogate')
+    missing = [name for name in names if name not in estimates]
+    if missing:
+        estimate_run = background.session_run('bank_estimates', (num_tasks, arrival_rate, mean, std_dev, modified),
+                                              lambda run: simulate_estimates(run, missing, num_tasks, arrival_rate, mean, std_dev))
+        background.show(estimate_run, lambda state, finished: show_estimates({**estimates, **(state or {})}, names))
+    else:
+        show_estimates(estimates, names)
+    st.caption(f"For the tasks this page generates; sweep and train {surrogate.MODEL_FILE} with surrogate.py")
 
     if st.button("Generate and Analyze Tasks"):
-        fcfs_match = 0
-        sjf_match = 0
-        srtn_match = 0
-        hrrn_match = 0
-
-        for _ in range(num_simulations):
-            tasks = generate_tasks_poisson(num_tasks, arrival_rate, mean, std_dev)
-
-            brute_force_time, brute_force_order = find_minimum_completion_time_with_brute_force(tasks)
-
-            env = simpy.Environment()
-            fcfs_time, fcfs_order = compute_fcfs_completion_time_with_simpy(env, tasks.copy())
-            if [task.task_id for task in fcfs_order] == [task.task_id for task in brute_force_order]:
-                fcfs_match += 1
-
-            env = simpy.Environment()
-            sjf_time, sjf_order = compute_sjf_completion_time_with_simpy(env, tasks.copy())
-            if [task.task_id for task in sjf_order] == [task.task_id for task in brute_force_order]:
-                sjf_match += 1
-
-            env = simpy.Environment()
-            srtn_time, srtn_order = compute_srtn_completion_time_with_simpy(env, tasks.copy())
-            if [task.task_id for task in srtn_order] == [task.task_id for task in brute_force_order]:
-                srtn_match += 1
-
-            env = simpy.Environment()
-            hrrn_time, hrrn_order = compute_hrrn_completion_time_with_simpy(env, tasks.copy())
-            if [task.task_id for task in hrrn_order] == [task.task_id for task in brute_force_order]:
-                hrrn_match += 1
-
-        matches = {
-            'FCFS': fcfs_match,
-            'SJF': sjf_match,
-            'SRTN': srtn_match,
-            'HRRN': hrrn_match
-        }
-
-        best_discipline = max(matches, key=matches.get)
-
-        st.subheader("Optimal Task Order Matching Results")
-        st.write(f"FCFS matches: {fcfs_match}")
-        st.write(f"SJF matches: {sjf_match}")
-        st.write(f"SRTN matches: {srtn_match}")
-        st.write(f"HRRN matches: {hrrn_match}")
-
-        st.subheader("Best Scheduling Discipline")
-        st.write(f"The scheduling discipline with the most optimal outputs is: {best_discipline} with {matches[best_discipline]} matches out of {num_simulations} simulations")
-
-        st.subheader("Optimal Task Order")
-        st.write(f"Optimal order of tasks: {[task.task_id for task in brute_force_order]}")
+        import montecarlo  # Imported lazily: montecarlo imports this module
+
+        previous = st.session_state.get('bank_run')
+        if previous is not None:
+            previous.cancel()
+        if not adaptive_replication:
+            # A fixed count still runs in batches, so partial counts can be shown
+            target, target_choice, target_metric = None, adaptive.EVERY_MEAN, 'Completion Time'
+            batch_size, max_simulations = max(1, num_simulations // 20), num_simulations
+        settings = (target, target_metric, max_simulations, antithetic)
+        st.session_state['bank_run'] = background.start(settings, lambda run: montecarlo.run_adaptive_simulations(
+            num_tasks, arrival_rate, mean, std_dev, target, target_choice, target_metric, seed=seed, batch_size=batch_size,
+            max_simulations=max_simulations, antithetic=antithetic, progress=run.publish, cancelled=run.cancelled))
+
+    run = st.session_state.get('bank_run')
+    if run is not None:
+        background.show(run, lambda state, finished: show_results(state, finished, *run.key))
+
+def show_results(state, finished, target, target_metric, max_simulations, antithetic):
+    if state is None:
+        st.write("Starting simulations...")
+        return
+    matches, optimal_ids, times, running, num_simulations, met = state
+    if not finished:
+        st.progress(num_simulations / max_simulations, text=f"{num_simulations} of up to {max_simulations} simulations")
+
+    if target is not None:
+        st.subheader("Adaptive Replication")
+        if met:
+            st.write(f"Target relative half-width of {target:.1%} reached after {num_simulations} simulations")
+        elif finished:
+            st.warning(f"Target relative half-width of {target:.1%} not reached within {num_simulations} simulations")
+        for name, r in running.items():
+            st.write(f"{name} mean {target_metric.lower()}: {r.mean:.4f} ± {adaptive.half_width(r):.4f} ({adaptive.relative_half_width(r):.1%})")
+
+    fcfs_match = matches['FCFS']
+    sjf_match = matches['SJF']
+    srtn_match = matches['SRTN']
+    hrrn_match = matches['HRRN']
+
+    best_discipline = max(matches, key=matches.get)
+
+    st.subheader("Optimal Task Order Matching Results")
+    st.write(f"FCFS matches: {fcfs_match}")
+    st.write(f"SJF matches: {sjf_match}")
+    st.write(f"SRTN matches: {srtn_match}")
+    st.write(f"HRRN matches: {hrrn_match}")
+
+    st.subheader("Best Scheduling Discipline")
+    st.write(f"The scheduling discipline with the most optimal outputs is: {best_discipline} with {matches[best_discipline]} matches out of {num_simulations} simulations")
+
+    st.subheader("Optimal Task Order")
+    st.write(f"Optimal order of tasks: {optimal_ids}")
+
+    # How many independent, unpaired simulations one simulation here is worth
+    st.subheader("Variance Reduction")
+    names = list(matches)
+    st.table(pd.DataFrame({metric: variance.reduction_factors([t[metric] for t in times], names, antithetic) for metric in adaptive.METRICS}))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,171 @@
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+import simpy
+import bank
+import engine
+import new
+import scheduling
+import tasks
+from instrumentation import Instrumentation
+from taskstore import engine_columns
+
+# Scaling benchmarks for the scheduling hot paths. Every target is swept over
+# task counts (and machine counts where the path supports them), recording wall
+# time, peak traced memory and SimPy events processed (left out for the heap
+# engine and batch paths, which never step the environment). Results are
+# written as JSON and compared against a stored baseline to catch regressions.
+
+SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+MACHINES = [1, 4, 16]
+TOLERANCE = 0.5  # Allowed slowdown (or memory growth) over the baseline
+NOISE_FLOOR = 0.02  # Seconds; faster runs are too noisy to compare
+REPEATS = 5
+MEMORY_FLOOR = 2**20  # Bytes; smaller peaks are dominated by allocator noise
+BATCH_REPLICATES = 100  # Replicates per batch for the vectorized FCFS targets
+
+
+# name: (generate(n), run(env, tasks, machines), largest n, takes machines)
+TARGETS = {
+    'tasks.fcfs': (lambda n: tasks.generate_tasks(n, 5, 2), lambda env, t, k: tasks.fcfs(env, t, k), 10**6, True),
+    'tasks.sjf': (lambda n: tasks.generate_tasks(n, 5, 2), lambda env, t, k: tasks.sjf(env, t, k), 10**6, True),
+    'tasks.rr': (lambda n: tasks.generate_tasks(n, 5, 2), lambda env, t, k: tasks.rr(env, t, 3, 0, k), 10**6, True),
+    'tasks.srtn': (lambda n: tasks.generate_tasks(n, 5, 2), lambda env, t, k: tasks.srtn(env, t, k), 10**6, True),
+    'tasks.hrrn': (lambda n: tasks.generate_tasks(n, 5, 2), lambda env, t, k: tasks.hrrn(env, t, k), 10**6, True),
+    'bank.fcfs[heap]': (lambda n: bank.generate_tasks_poisson(n, 1.0, 5, 2), lambda env, t, k: bank.compute_fcfs_completion_time_with_simpy(env, t, 'heap'), 10**6, False),
+    'bank.sjf[heap]': (lambda n: bank.generate_tasks_poisson(n, 1.0, 5, 2), lambda env, t, k: bank.compute_sjf_completion_time_with_simpy(env, t, 'heap'), 10**6, False),
+    'bank.srtn[heap]': (lambda n: bank.generate_tasks_poisson(n, 1.0, 5, 2), lambda env, t, k: bank.compute_srtn_completion_time_with_simpy(env, t, 'heap'), 10**6, False),
+    'bank.hrrn[heap]': (lambda n: bank.generate_tasks_poisson(n, 1.0, 5, 2), lambda env, t, k: bank.compute_hrrn_completion_time_with_simpy(env, t, 'heap'), 10**6, False),
+    'bank.fcfs[simpy]': (lambda n: bank.generate_tasks_poisson(n, 1.0, 5, 2), lambda env, t, k: bank.compute_fcfs_completion_time_with_simpy(env, t, 'simpy'), 10**5, False),
+    'bank.sjf[simpy]': (lambda n: bank.generate_tasks_poisson(n, 1.0, 5, 2), lambda env, t, k: bank.compute_sjf_completion_time_with_simpy(env, t, 'simpy'), 10**5, False),
+    # Both re-sort the shared queue on every dispatch (SRTN on every 1-unit slice), so they are quadratic
+    'bank.srtn[simpy]': (lambda n: bank.generate_tasks_poisson(n, 1.0, 5, 2), lambda env, t, k: bank.compute_srtn_completion_time_with_simpy(env, t, 'simpy'), 10**3, False),
+    'bank.hrrn[simpy]': (lambda n: bank.generate_tasks_poisson(n, 1.0, 5, 2), lambda env, t, k: bank.compute_hrrn_completion_time_with_simpy(env, t, 'simpy'), 10**3, False),
+    # n tasks in each of BATCH_REPLICATES replicates, evaluated in one vectorized pass
+    'bank.fcfs[batch]': (lambda n: bank.generate_task_stores_poisson(BATCH_REPLICATES, n, 1.0, 5, 2), lambda env, t, k: run_fcfs_batch(t), 10**4, False),
+    'tasks.fcfs[batch]': (lambda n: tasks.generate_task_stores(BATCH_REPLICATES, n, 5, 2, np.random.default_rng(n)), lambda env, t, k: run_fcfs_batch(t), 10**4, False),
+    'scheduling.fcfs': (lambda n: scheduling.generate_wash_tasks(n, 5, 2), lambda env, t, k: scheduling.simulate_fcfs(env, t), 10**5, False),
+    'scheduling.sjf': (lambda n: scheduling.generate_wash_tasks(n, 5, 2), lambda env, t, k: scheduling.simulate_sjf(env, t), 10**5, False),
+    'scheduling.rr': (lambda n: scheduling.generate_wash_tasks(n, 5, 2), lambda env, t, k: scheduling.simulate_rr(env, t, 3), 10**6, False),
+    'scheduling.srtn': (lambda n: scheduling.generate_wash_tasks(n, 5, 2), lambda env, t, k: scheduling.simulate_srtn(env, t), 10**6, False),
+    'scheduling.hrrn': (lambda n: scheduling.generate_wash_tasks(n, 5, 2), lambda env, t, k: scheduling.simulate_hrrn(env, t), 10**6, False),
+    'new.fcfs': (lambda n: new.generate_wash_tasks(n, 5, 2), lambda env, t, k: new.simulate_washing(env, t, 'FCFS'), 10**5, False),
+    'new.sjf': (lambda n: new.generate_wash_tasks(n, 5, 2), lambda env, t, k: new.simulate_washing(env, t, 'SJF'), 10**5, False),
+    'new.rr': (lambda n: new.generate_wash_tasks(n, 5, 2), lambda env, t, k: new.simulate_washing(env, t, 'RR'), 10**5, False),
+    # Both rescan the ready queue on every decision, so they are quadratic
+    'new.srtn': (lambda n: new.generate_wash_tasks(n, 5, 2), lambda env, t, k: new.simulate_washing(env, t, 'SRTN'), 10**4, False),
+    'new.hrrn': (lambda n: new.generate_wash_tasks(n, 5, 2), lambda env, t, k: new.simulate_washing(env, t, 'HRRN'), 10**4, False),
+}
+
+
+def batch_columns(stores):
+    return np.stack([store.arrival for store in stores]), np.stack([store.duration for store in stores])
+
+
+def run_fcfs_batch(stores):
+    return engine.evaluate_fcfs_batch(*batch_columns(stores))
+
+
+def check_fcfs_batch(n=100, seed=0):
+    # The batch totals must match the heap engine replicate by replicate
+    for stores in (bank.generate_task_stores_poisson(10, n, 1.0, 5, 2, np.random.default_rng(seed)),
+                   tasks.generate_task_stores(10, n, 5, 2, np.random.default_rng(seed))):
+        _, turnaround, _ = run_fcfs_batch(stores)
+        for store, total in zip(stores, turnaround):
+            arrivals, durations = engine_columns(store)
+            _, ends, _ = engine.simulate(arrivals, durations, 'FCFS')
+            expected = sum(end - arrival for end, arrival in zip(ends, arrivals))
+            if not np.isclose(total, expected):
+                raise AssertionError(f"FCFS batch total {total} differs from the heap engine's {expected}")
+
+
+def measure(run, task_list, machines, repeats=REPEATS):
+    # Best of a few timed runs (fewer once they take a second) on plain SimPy
+    # environments, then one traced and instrumented run for memory and events
+    seconds = float('inf')
+    elapsed = 0
+    for _ in range(repeats):
+        env = simpy.Environment()
+        start = time.perf_counter()
+        run(env, list(task_list), machines)
+        duration = time.perf_counter() - start
+        seconds = min(seconds, duration)
+        elapsed += duration
+        if elapsed > 1:
+            break
+
+    instrumentation = Instrumentation()
+    tracemalloc.start()
+    run(instrumentation.environment(), list(task_list), machines)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak_bytes, instrumentation.events_processed or None  # None: no SimPy events to count
+
+
+def run_benchmarks(targets=None, sizes=SIZES, machines=MACHINES, max_n=None, seed=0):
+    records = []
+    for name in targets or TARGETS:
+        generate, run, largest, takes_machines = TARGETS[name]
+        for n in sizes:
+            if n > largest or (max_n is not None and n > max_n):
+                continue
+            np.random.seed(seed)
+            random.seed(seed)
+            task_list = generate(n)
+            for k in (machines if takes_machines else [1]):
+                seconds, peak_bytes, events = measure(run, task_list, k)
+                record = {'target': name, 'n': n, 'machines': k, 'seconds': seconds, 'peak_bytes': peak_bytes}
+                if events is not None:
+                    record['events'] = events
+                records.append(record)
+                print(f"{name:<18} n={n:<8} k={k:<3} {seconds:>9.4f}s {peak_bytes / 2**20:>9.1f} MiB {'-' if events is None else events:>9} events", flush=True)
+    return records
+
+
+def write_results(records, filename):
+    report = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'records': records,
+    }
+    with open(filename, 'w') as file:
+        json.dump(report, file, indent=1)
+
+
+def compare(records, baseline_filename, tolerance=TOLERANCE):
+    with open(baseline_filename) as file:
+        baseline = {(r['target'], r['n'], r['machines']): r for r in json.load(file)['records']}
+    regressions = []
+    for record in records:
+        previous = baseline.get((record['target'], record['n'], record['machines']))
+        if previous is None:
+            continue
+        if record['seconds'] > NOISE_FLOOR and record['seconds'] > previous['seconds'] * (1 + tolerance):
+            regressions.append((record, 'seconds', previous['seconds']))
+        if record['peak_bytes'] > MEMORY_FLOOR and record['peak_bytes'] > previous['peak_bytes'] * (1 + tolerance):
+            regressions.append((record, 'peak_bytes', previous['peak_bytes']))
+    return regressions
+
+
+if __name__ == "__main__":
+    # python benchmark.py [results.json] [baseline.json] [max n]
+    filenames = [arg for arg in sys.argv[1:] if arg.endswith('.json')]
+    limits = [int(arg) for arg in sys.argv[1:] if arg.isdigit()]
+    output = filenames[0] if filenames else 'benchmark.json'
+    check_fcfs_batch()
+    records = run_benchmarks(max_n=limits[0] if limits else None)
+    write_results(records, output)
+    print(f"Results written to {output}")
+
+    if len(filenames) > 1:
+        regressions = compare(records, filenames[1])
+        for record, metric, previous in regressions:
+            print(f"REGRESSION {record['target']} n={record['n']} k={record['machines']}: {metric} {previous:.4g} -> {record[metric]:.4g}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {filenames[1]}")
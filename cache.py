@@ -0,0 +1,89 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+# Per-discipline result cache for the Streamlit pages. A result is keyed on the
+# task set it was computed from, the discipline, and only the parameters that
+# discipline actually reads, so moving the Round Robin slider leaves every
+# other discipline's entry valid.
+
+DEPENDENCIES = {
+    'FCFS': ('machines',),
+    'SJF': ('machines',),
+    'SRTN': ('machines',),
+    'HRRN': ('machines',),
+    'RR': ('machines', 'time_slice', 'switch_overhead'),
+    'Brute Force': (),
+    'Optimal': (),
+}
+
+
+class ResultCache:
+    def __init__(self, maxsize=256, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()  # Shared by every session's background runs
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def key(self, task_set, discipline, params):
+        return (task_set, discipline, tuple((name, params.get(name)) for name in DEPENDENCIES[discipline]))
+
+    def filename(self, key):
+        return os.path.join(self.path, hashlib.sha1(repr(key).encode()).hexdigest() + '.pkl')
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.touch(key)
+                return self.entries[key]
+            if self.path is not None and os.path.exists(self.filename(key)):
+                with open(self.filename(key), 'rb') as file:
+                    result = pickle.load(file)
+                self.touch(key)
+                self.put(key, result, persist=False)
+                return result
+        raise KeyError(key)
+
+    def put(self, key, result, persist=True):
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)  # Evict the least recently used entry
+            if persist and self.path is not None:
+                with open(self.filename(key), 'wb') as file:
+                    pickle.dump(result, file)
+                self.prune()
+
+    def touch(self, key):
+        # Pruning goes by modification time, so a hit marks the file as recently used
+        if self.path is not None and os.path.exists(self.filename(key)):
+            os.utime(self.filename(key))
+
+    def prune(self):
+        # The directory holds at most maxsize results too; the least recently used go first
+        names = [os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith('.pkl')]
+        if len(names) > self.maxsize:
+            names.sort(key=os.path.getmtime)
+            for name in names[:len(names) - self.maxsize]:
+                os.remove(name)
+
+    def get_or_compute(self, task_set, discipline, params, compute):
+        key = self.key(task_set, discipline, params)
+        try:
+            result = self.get(key)
+            with self.lock:
+                self.hits += 1
+        except KeyError:
+            result = compute()  # Outside the lock, so other runs are not held up
+            with self.lock:
+                self.misses += 1
+            self.put(key, result)
+        return result
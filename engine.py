@@ -0,0 +1,300 @@
+import heapq
+from collections import deque
+import numpy as np
+
+# Native discrete-event engine for one or more identical machines. Instead of
+# one SimPy process per task, a single cursor walks the arrivals in time order,
+# a heap holds the ready queue and another heap holds the machines keyed by the
+# time they next free up, so a dispatch costs O(log n + log k).
+#
+# Every engine takes parallel sequences of arrival times and durations and
+# returns (starts, ends, order): per-task start/end times indexed like the
+# input, and the task indices in completion order.
+
+DISCIPLINES = ('FCFS', 'SJF', 'RR', 'SRTN', 'HRRN')
+
+
+def arrival_order(arrivals):
+    # Stable, so tasks arriving at the same instant keep their input order
+    return sorted(range(len(arrivals)), key=arrivals.__getitem__)
+
+
+def run_nonpreemptive(arrivals, durations, priority, machines=1):
+    n = len(arrivals)
+    pending = arrival_order(arrivals)
+    starts = [0] * n
+    ends = [0] * n
+    order = []
+    ready = []
+    free = [(0, machine) for machine in range(machines)]  # (time the machine frees up, machine)
+    cursor = 0
+    now = 0
+
+    while cursor < n or ready:
+        now = max(now, free[0][0])
+        if not ready and arrivals[pending[cursor]] > now:
+            now = arrivals[pending[cursor]]  # Machines idle until the next arrival
+        while cursor < n and arrivals[pending[cursor]] <= now:
+            i = pending[cursor]
+            heapq.heappush(ready, (priority(i), i))
+            cursor += 1
+
+        _, i = heapq.heappop(ready)
+        starts[i] = now
+        ends[i] = now + durations[i]
+        heapq.heapreplace(free, (ends[i], free[0][1]))
+        order.append(i)
+
+    if machines > 1:
+        order.sort(key=ends.__getitem__)
+    return starts, ends, order
+
+
+def run_fcfs(arrivals, durations, machines=1):
+    return run_nonpreemptive(arrivals, durations, lambda i: arrivals[i], machines)
+
+
+def run_sjf(arrivals, durations, machines=1):
+    return run_nonpreemptive(arrivals, durations, lambda i: (durations[i], arrivals[i]), machines)
+
+
+def run_srtn(arrivals, durations, machines=1):
+    # The machines always run the tasks with the least remaining time. Running
+    # tasks are keyed by the absolute time they would finish, so time passing
+    # needs no updates; two heaps with lazy deletion give the next completion
+    # and the running task an arrival would preempt.
+    n = len(arrivals)
+    pending = arrival_order(arrivals)
+    starts = [None] * n
+    ends = [0] * n
+    order = []
+    waiting = []  # (remaining time, arrival time, index)
+    running = {}  # index -> finish time
+    by_finish = []  # (finish time, arrival time, index)
+    by_latest = []  # (-finish time, -arrival time, -index)
+    cursor = 0
+    now = 0
+
+    def run(i, remaining):
+        if starts[i] is None:
+            starts[i] = now
+        running[i] = now + remaining
+        heapq.heappush(by_finish, (now + remaining, arrivals[i], i))
+        heapq.heappush(by_latest, (-(now + remaining), -arrivals[i], -i))
+
+    def valid_top(heap, sign):
+        while heap and running.get(sign * heap[0][2]) != sign * heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    while cursor < n or running:
+        top = valid_top(by_finish, 1)
+        next_completion = top[0] if top else float('inf')
+        next_arrival = arrivals[pending[cursor]] if cursor < n else float('inf')
+        now = min(next_completion, next_arrival)
+
+        # Handle every event at this instant before deciding who runs
+        while top and top[0] <= now:
+            heapq.heappop(by_finish)
+            del running[top[2]]
+            ends[top[2]] = now
+            order.append(top[2])
+            top = valid_top(by_finish, 1)
+        while cursor < n and arrivals[pending[cursor]] <= now:
+            i = pending[cursor]
+            heapq.heappush(waiting, (durations[i], arrivals[i], i))
+            cursor += 1
+
+        while waiting:
+            if len(running) < machines:
+                remaining, _, i = heapq.heappop(waiting)
+                run(i, remaining)
+                continue
+            finish, arrival, j = [-value for value in valid_top(by_latest, -1)]
+            if waiting[0] >= (finish - now, arrival, j):
+                break
+            # Preempt the running task with the most work left
+            heapq.heappop(by_latest)
+            del running[j]
+            heapq.heappush(waiting, (finish - now, arrival, j))
+
+    return starts, ends, order
+
+
+def run_hrrn(arrivals, durations, machines=1):
+    # Response ratios are lines in time, 1 + (t - a) / d, so the ready tasks
+    # form a kinetic tournament: a tree over arrival slots where every node keeps
+    # the winner of its two children and the time at which the loser overtakes
+    # it. Only certificates that expire before a dispatch instant are revisited,
+    # giving O(log^2 n) amortized work per arrival and dispatch instead of
+    # rescanning the whole queue. Ties go to the earlier arrival.
+    n = len(arrivals)
+    pending = arrival_order(arrivals)
+    slot = [0] * n
+    for position, i in enumerate(pending):
+        slot[i] = position
+    size = 1
+    while size < max(n, 1):
+        size *= 2
+    winner = [-1] * (2 * size)
+    certificate = [None] * size  # (time, strict); strict ones expire only after that time
+    expiries = []
+    starts = [0] * n
+    ends = [0] * n
+    order = []
+    free = [(0, machine) for machine in range(machines)]
+    ready = 0
+    cursor = 0
+    now = 0
+
+    def beats(i, j):
+        lhs = (now - arrivals[i]) * durations[j]
+        rhs = (now - arrivals[j]) * durations[i]
+        if lhs != rhs:
+            return lhs > rhs
+        return (arrivals[i], i) < (arrivals[j], j)
+
+    def update(node):
+        left, right = winner[2 * node], winner[2 * node + 1]
+        expiry = None
+        if left < 0 or right < 0:
+            best = max(left, right)
+        else:
+            best, other = (left, right) if beats(left, right) else (right, left)
+            if durations[other] < durations[best]:
+                # The loser's ratio grows faster and catches up at this instant
+                crossing = (arrivals[other] * durations[best] - arrivals[best] * durations[other]) / (durations[best] - durations[other])
+                expiry = (crossing, 0) if crossing > now else (now, 1)
+        winner[node] = best
+        if expiry is not None and expiry != certificate[node]:
+            heapq.heappush(expiries, (expiry[0], expiry[1], node))
+        certificate[node] = expiry
+
+    def set_slot(position, i):
+        node = size + position
+        winner[node] = i
+        node //= 2
+        while node:
+            update(node)
+            node //= 2
+
+    def advance():
+        while expiries and (expiries[0][0] < now or (expiries[0][0] == now and not expiries[0][1])):
+            expiry, strict, node = heapq.heappop(expiries)
+            if certificate[node] != (expiry, strict):
+                continue
+            certificate[node] = None
+            while node:
+                update(node)
+                node //= 2
+
+    while cursor < n or ready:
+        now = max(now, free[0][0])
+        if not ready and arrivals[pending[cursor]] > now:
+            now = arrivals[pending[cursor]]
+        advance()
+        while cursor < n and arrivals[pending[cursor]] <= now:
+            set_slot(cursor, pending[cursor])
+            ready += 1
+            cursor += 1
+
+        i = winner[1]
+        set_slot(slot[i], -1)
+        ready -= 1
+        starts[i] = now
+        ends[i] = now + durations[i]
+        heapq.heapreplace(free, (ends[i], free[0][1]))
+        order.append(i)
+
+    if machines > 1:
+        order.sort(key=ends.__getitem__)
+    return starts, ends, order
+
+
+def run_rr(arrivals, durations, time_slice, switch_overhead=0, machines=1):
+    n = len(arrivals)
+    pending = arrival_order(arrivals)
+    remaining = list(durations)
+    starts = [None] * n
+    ends = [0] * n
+    order = []
+    ready = deque()
+    idle = list(range(machines))  # Machines without a quantum in progress
+    busy = []  # (quantum end, machine, task)
+    last = [None] * machines  # Task currently loaded on each machine
+    cursor = 0
+    now = 0
+
+    while cursor < n or ready or busy:
+        if ready and idle:
+            machine = heapq.heappop(idle)
+            i = ready.popleft()
+            start = now
+            if last[machine] is not None and last[machine] != i:
+                start += switch_overhead
+            last[machine] = i
+            if starts[i] is None:
+                starts[i] = start
+            run_time = min(time_slice, remaining[i])
+            remaining[i] -= run_time
+            heapq.heappush(busy, (start + run_time, machine, i))
+            continue
+
+        next_arrival = arrivals[pending[cursor]] if cursor < n else float('inf')
+        now = min(next_arrival, busy[0][0]) if busy else next_arrival
+
+        # Tasks that arrived during the quantum queue ahead of the preempted task
+        while cursor < n and arrivals[pending[cursor]] <= now:
+            ready.append(pending[cursor])
+            cursor += 1
+        while busy and busy[0][0] <= now:
+            _, machine, i = heapq.heappop(busy)
+            heapq.heappush(idle, machine)
+            if remaining[i] > 0:
+                ready.append(i)
+            else:
+                ends[i] = now
+                order.append(i)
+
+    return starts, ends, order
+
+
+def totals(arrivals, durations, ends):
+    # (total turnaround, total burst, total waiting) as returned by tasks.py and scheduling.py
+    total_turnaround_time = sum(end - arrival for arrival, end in zip(arrivals, ends))
+    total_burst_time = sum(durations)
+    return total_turnaround_time, total_burst_time, total_turnaround_time - total_burst_time
+
+
+def simulate(arrivals, durations, discipline, time_slice=1, switch_overhead=0, machines=1):
+    if discipline == 'FCFS':
+        return run_fcfs(arrivals, durations, machines)
+    elif discipline == 'SJF':
+        return run_sjf(arrivals, durations, machines)
+    elif discipline == 'RR':
+        return run_rr(arrivals, durations, time_slice, switch_overhead, machines)
+    elif discipline == 'SRTN':
+        return run_srtn(arrivals, durations, machines)
+    elif discipline == 'HRRN':
+        return run_hrrn(arrivals, durations, machines)
+    else:
+        raise ValueError(f"Invalid scheduling discipline: {discipline}")
+
+
+def evaluate_fcfs_batch(arrivals, durations):
+    # Vectorized FCFS over an (R x n) matrix of replicates. The Lindley recursion
+    # end_j = max(a_j, end_{j-1}) + d_j unrolls to
+    # end_j = W_j + max_{i<=j}(a_i - W_{i-1}) with W the running work total,
+    # so the whole batch is one cumulative sum and one cumulative maximum.
+    arrivals = np.atleast_2d(np.asarray(arrivals, dtype=float))
+    durations = np.atleast_2d(np.asarray(durations, dtype=float))
+    order = np.argsort(arrivals, axis=1, kind='stable')
+    arrivals = np.take_along_axis(arrivals, order, axis=1)
+    durations = np.take_along_axis(durations, order, axis=1)
+
+    work = np.cumsum(durations, axis=1)
+    ends = work + np.maximum.accumulate(arrivals - (work - durations), axis=1)
+    turnaround = ends - arrivals
+    waiting = turnaround - durations
+
+    return waiting.sum(axis=1), turnaround.sum(axis=1), ends.sum(axis=1)
@@ -0,0 +1,61 @@
+import time
+from contextlib import contextmanager, nullcontext
+import simpy
+
+# Opt-in run instrumentation: SimPy event counts, peak event queue length and
+# wall time per phase (generate / simulate / aggregate / render). Callers pass
+# None to switch it off, which leaves a plain simpy.Environment and a no-op
+# phase context, so a disabled run pays nothing per event.
+
+PHASES = ('generate', 'simulate', 'aggregate', 'render')
+
+
+class InstrumentedEnvironment(simpy.Environment):
+    def __init__(self, instrumentation):
+        super().__init__()
+        self.instrumentation = instrumentation
+
+    def schedule(self, event, priority=simpy.core.NORMAL, delay=0):
+        super().schedule(event, priority, delay)
+        self.instrumentation.events_scheduled += 1
+        if len(self._queue) > self.instrumentation.peak_queue:
+            self.instrumentation.peak_queue = len(self._queue)
+
+    def step(self):
+        super().step()  # Raises EmptySchedule once the queue is drained
+        self.instrumentation.events_processed += 1
+
+
+class Instrumentation:
+    def __init__(self):
+        self.events_scheduled = 0
+        self.events_processed = 0
+        self.peak_queue = 0
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+
+    def environment(self):
+        return InstrumentedEnvironment(self)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_times[name] = self.phase_times.get(name, 0.0) + time.perf_counter() - start
+
+    def as_dict(self):
+        return {
+            'events_scheduled': self.events_scheduled,
+            'events_processed': self.events_processed,
+            'peak_queue': self.peak_queue,
+            **{f'{name}_seconds': seconds for name, seconds in self.phase_times.items()},
+        }
+
+
+def environment(instrumentation):
+    return simpy.Environment() if instrumentation is None else instrumentation.environment()
+
+
+def phase(instrumentation, name):
+    return nullcontext() if instrumentation is None else instrumentation.phase(name)
@@ -1,12 +1,18 @@
 import csv
 import random
 from ortools.linear_solver import pywraplp
+import allocation
 
 def generate_random_data(users, loads):
     processing_times = {(u, l): random.randint(1, 10) for u in users for l in loads}
     return processing_times
 
-def solve_optimization_problem(users, loads, machines, processing_times):
+def solve_optimization_problem(users, loads, machines, processing_times, backend='auto'):
+    # The capacity constraints are disjoint, so 'auto' solves this as a flow problem
+    groups = allocation.capacity_groups(users, loads, machines, allocation.CAPACITY_PER_MACHINE_USER)
+    if allocation.resolve_backend(backend, groups) == 'flow':
+        return allocation.flow_solution(users, loads, machines, groups, dict.fromkeys(processing_times, 1))
+
     solver = pywraplp.Solver.CreateSolver('SCIP')
 
     # Define decision variables
@@ -35,38 +41,36 @@ def solve_optimization_problem(users, loads, machines, processing_times):
     
     return solver, x
 
-def run_simulation(num_simulations, num_users, num_loads_per_user, num_machines):
+def run_simulation(num_simulations, num_users, num_loads_per_user, num_machines, max_workers=1, num_threads=1, time_limit=None, backend='auto', objective='count'):
     results = []
     users = [f'User{i+1}' for i in range(num_users)]
     loads = [f'Load{j+1}' for j in range(num_loads_per_user)]
     machines = [f'Machine{k+1}' for k in range(num_machines)]
-    for _ in range(num_simulations):
-        processing_times = generate_random_data(users, loads)
-        solver, x = solve_optimization_problem(users, loads, machines, processing_times)
-        num_users_allocated = sum(x[u, j, l].solution_value() > 0.5 for u in users for j in machines for l in loads)
-        allocation_results = {f'Allocation_{i}': next(j for j in machines if x[u, j, l].solution_value() > 0.5) for u in users for l in loads for i in range(1, num_users*num_loads_per_user + 1)}
-        result = {'Num Users Allocated': num_users_allocated, **allocation_results}
-        results.append(result)
+    replicates = [generate_random_data(users, loads) for _ in range(num_simulations)]
+    # The model is built once per worker process and re-solved for each replicate.
+    # objective='completion_time' schedules every load to minimise total completion time instead.
+    solutions = allocation.solve_batch(users, loads, machines, allocation.CAPACITY_PER_MACHINE_USER, replicates, max_workers, num_threads, time_limit, backend, objective)
+    for replicate, (processing_times, (_, _, _, assigned)) in enumerate(zip(replicates, solutions), 1):
+        results.extend(allocation.assignment_rows(replicate, assigned, processing_times))
     return results
 
-def write_results_to_csv(results, filename, num_users, num_loads_per_user):
+def write_results_to_csv(results, filename):
     with open(filename, mode='w', newline='') as file:
-        fieldnames = ['Num Users Allocated'] + [f'Allocation_{i}' for i in range(1, num_users*num_loads_per_user + 1)]
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
-        for result in results:
-            writer.writerow(result)
+        writer = csv.writer(file)
+        writer.writerow(allocation.RESULT_COLUMNS)
+        writer.writerows(results)
 
 # Example usage
-num_simulations = int(input("Enter the number of simulations: "))
-num_users = int(input("Enter the number of users: "))
-num_loads_per_user = int(input("Enter the maximum number of loads for each user: "))
-num_machines = int(input("Enter the number of machines: "))
+if __name__ == "__main__":
+    num_simulations = int(input("Enter the number of simulations: "))
+    num_users = int(input("Enter the number of users: "))
+    num_loads_per_user = int(input("Enter the maximum number of loads for each user: "))
+    num_machines = int(input("Enter the number of machines: "))
 
-results = run_simulation(num_simulations, num_users, num_loads_per_user, num_machines)
+    results = run_simulation(num_simulations, num_users, num_loads_per_user, num_machines, max_workers=None)
 
-# Write results to CSV file
-filename = 'maximize_users.csv'
-write_results_to_csv(results, filename, num_users, num_loads_per_user)
+    # Write results to CSV file
+    filename = 'maximize_users.csv'
+    write_results_to_csv(results, filename)
 
-print("Data written to maximize_users.csv file.")
+    print("Data written to maximize_users.csv file.")
@@ -0,0 +1,121 @@
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+import simpy
+import adaptive
+import bank
+from variance import InverseTransformGenerator
+
+# Monte Carlo replicates for bank.py. Every replicate draws from its own
+# SeedSequence child stream, so a replicate's tasks depend only on the root
+# seed and its index, never on which worker ran it or in what order. With
+# antithetic replicates, twins 2k and 2k + 1 share child k, the second mirrored.
+
+COMPARISONS = {
+    'FCFS': bank.compute_fcfs_completion_time_with_simpy,
+    'SJF': bank.compute_sjf_completion_time_with_simpy,
+    'SRTN': bank.compute_srtn_completion_time_with_simpy,
+    'HRRN': bank.compute_hrrn_completion_time_with_simpy,
+}
+
+
+def simulate_replicate(seed, mirror, num_tasks, arrival_rate, mean, std_dev, backend='heap'):
+    # backend='simpy' runs the original SimPy models, whose SJF and SRTN totals and
+    # task orders differ from the heap engine's (see bank.py), so matches differ too
+    # mirror is None for a plain replicate, else False / True for the first / second antithetic twin
+    rng = np.random.default_rng(seed)
+    if mirror is not None:
+        rng = InverseTransformGenerator(rng, mirror)
+    tasks = bank.generate_tasks_poisson(num_tasks, arrival_rate, mean, std_dev, rng)
+    _, optimal_order = bank.find_minimum_completion_time_exact(tasks)
+    optimal_ids = [task.task_id for task in optimal_order]
+
+    # Every discipline runs the same tasks. Mean completion and waiting time per
+    # discipline are the observations adaptive replication tracks.
+    mean_duration = sum(task.completion_time for task in tasks) / num_tasks
+    matches = {}
+    times = {metric: {} for metric in adaptive.METRICS}
+    for name, compute in COMPARISONS.items():
+        total, order = compute(simpy.Environment(), tasks.copy(), backend)
+        matches[name] = int([task.task_id for task in order] == optimal_ids)
+        times['Completion Time'][name] = total / num_tasks
+        times['Waiting Time'][name] = total / num_tasks - mean_duration
+    return matches, optimal_ids, times
+
+
+def replicate_seeds(seed_sequence, children, first, count, antithetic=False):
+    # Seeds and mirror flags of replicates first .. first + count - 1. children holds
+    # the SeedSequence children spawned so far and is extended in order as needed.
+    indices = range(first, first + count)
+    needed = (first + count + 1) // 2 if antithetic else first + count
+    if needed > len(children):
+        children.extend(seed_sequence.spawn(needed - len(children)))
+    if antithetic:
+        return [children[i // 2] for i in indices], [i % 2 == 1 for i in indices]
+    return [children[i] for i in indices], [None] * count
+
+
+def merge_results(results, matches):
+    # Counters are merged in replicate order, so the totals do not depend on max_workers
+    optimal_ids = []
+    for replicate_matches, optimal_ids, _ in results:
+        for name, matched in replicate_matches.items():
+            matches[name] += matched
+    return optimal_ids, [times for _, _, times in results]
+
+
+def run_simulations(num_simulations, num_tasks, arrival_rate, mean, std_dev, seed=None, max_workers=None, backend='heap', antithetic=False):
+    seeds, mirrors = replicate_seeds(np.random.SeedSequence(seed), [], 0, num_simulations, antithetic)
+    replicate = partial(simulate_replicate, num_tasks=num_tasks, arrival_rate=arrival_rate, mean=mean, std_dev=std_dev, backend=backend)
+    matches = dict.fromkeys(COMPARISONS, 0)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        results = list(map(replicate, seeds, mirrors))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(replicate, seeds, mirrors, chunksize=max(1, num_simulations // (max_workers * 4))))
+
+    optimal_ids, times = merge_results(results, matches)
+    return matches, optimal_ids, times
+
+
+def run_adaptive_simulations(num_tasks, arrival_rate, mean, std_dev, target, choice=adaptive.EVERY_MEAN, metric='Completion Time',
+                             seed=None, batch_size=10, max_simulations=1000, max_workers=None, backend='heap', antithetic=False,
+                             progress=None, cancelled=None):
+    # Adds replicates in batches until the target relative half-width is met (or
+    # runs all max_simulations when target is None). Replicate i is the same task
+    # set run_simulations would draw for it, whatever the batch size. progress gets
+    # a copy of the partial return value, with met None, after every batch.
+    seed_sequence = np.random.SeedSequence(seed)
+    children = []
+    replicate = partial(simulate_replicate, num_tasks=num_tasks, arrival_rate=arrival_rate, mean=mean, std_dev=std_dev, backend=backend)
+    matches = dict.fromkeys(COMPARISONS, 0)
+    optimal_ids = []
+    times = []
+
+    def sample(first, count):
+        nonlocal optimal_ids
+        seeds, mirrors = replicate_seeds(seed_sequence, children, first, count, antithetic)
+        optimal_ids, batch_times = merge_results(list(mapper(replicate, seeds, mirrors)), matches)
+        times.extend(batch_times)
+        return [replicate_times[metric] for replicate_times in batch_times]
+
+    def report(running, replicates):
+        if progress is not None:
+            progress((dict(matches), optimal_ids, list(times), {name: copy.copy(r) for name, r in running.items()}, replicates, None))
+
+    statistics = adaptive.statistics_for(list(COMPARISONS), choice)
+    options = dict(batch_size=batch_size, max_replicates=max_simulations, antithetic=antithetic, progress=report, cancelled=cancelled)
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        mapper = map
+        running, num_simulations, met = adaptive.run_sequential(sample, statistics, target, **options)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            mapper = executor.map
+            running, num_simulations, met = adaptive.run_sequential(sample, statistics, target, **options)
+
+    return matches, optimal_ids, times, running, num_simulations, met
@@ -1,15 +1,36 @@
 import simpy
 import random
+import itertools
+import copy
+from collections import deque
 import numpy as np
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
+import adaptive
+import background
+import variance
+from cache import ResultCache
+from instrumentation import Instrumentation, environment, phase
+from taskstore import TaskStore, WASH_TYPES, FABRIC_TYPES
 
 # Parameters for cost and detergent
 COST_PER_MINUTE = 0.5  # Cost per minute of washing
 DETERGENT_COST_PER_UNIT = 0.1  # Cost per unit of detergent
 DETERGENT_UNITS_PER_KG = 0.1  # Units of detergent per kg of clothes
 
+FIXED_BATCH_SIZE = 10  # Simulations between partial results on the page
+MAX_SIMULATIONS = 1000  # Largest adaptive replicate cap on the slider
+ALGORITHMS = ['FCFS', 'SJF', 'RR', 'SRTN', 'HRRN', 'Brute Force']
+
+# Wash duration distribution per wash type: (mean, std dev, minimum) in minutes
+WASH_DURATIONS = {
+    'quick': (15, 2, 10),
+    'normal': (30, 5, 20),
+    'heavy': (45, 10, 30),
+    'regular': (25, 5, 15),
+}
+
 class WashingTask:
     def __init__(self, user_id, weight, fabric_type, wash_type, arrival_time):
         self.user_id = user_id
@@ -24,14 +45,8 @@ class WashingTask:
 
     def calculate_wash_duration(self):
         # Different wash types can have different durations
-        if self.wash_type == 'quick':
-            return max(10, int(np.random.normal(15, 2)))
-        elif self.wash_type == 'normal':
-            return max(20, int(np.random.normal(30, 5)))
-        elif self.wash_type == 'heavy':
-            return max(30, int(np.random.normal(45, 10)))
-        else:
-            return max(15, int(np.random.normal(25, 5)))
+        mean, std_dev, minimum = WASH_DURATIONS.get(self.wash_type, WASH_DURATIONS['regular'])
+        return max(minimum, int(np.random.normal(mean, std_dev)))
 
 def generate_wash_tasks(num_users, mean_weight, std_dev_weight):
     tasks = []
@@ -44,48 +59,110 @@ def generate_wash_tasks(num_users, mean_weight, std_dev_weight):
         tasks.append(task)
     return tasks
 
-def simulate_washing(env, tasks, scheduling_algorithm, time_slice=3):
+def generate_wash_task_stores(num_simulations, num_users, mean_weight, std_dev_weight, rng, antithetic=False):
+    # Same distributions as generate_wash_tasks, but every replicate's columns
+    # are drawn as (num_simulations, num_users) arrays from one Generator. Arrays
+    # are made in the store's column dtypes, so each replicate's row is a view.
+    # With antithetic=True, replicates 2k and 2k + 1 are antithetic twins.
+    if antithetic:
+        return variance.antithetic_pairs(lambda n, twin_rng: generate_wash_task_stores(n, num_users, mean_weight, std_dev_weight, twin_rng), num_simulations, rng)
+    shape = (num_simulations, num_users)
+    weights = np.maximum(1, np.trunc(rng.normal(mean_weight, std_dev_weight, shape)))
+    fabric_types = rng.integers(0, len(FABRIC_TYPES), shape, dtype=np.int8)
+    wash_types = rng.integers(WASH_TYPES.index('quick'), WASH_TYPES.index('heavy') + 1, shape, dtype=np.int8)
+    arrivals = rng.integers(0, 10, shape, endpoint=True).astype(np.float64)
+    mean, std_dev, minimum = (np.array([WASH_DURATIONS[wash_type][k] for wash_type in WASH_TYPES], dtype=np.float64)[wash_types] for k in range(3))
+    durations = np.maximum(minimum, np.trunc(mean + std_dev * rng.standard_normal(shape)))
+    return [TaskStore.from_arrays(arrivals[sim], durations[sim], weights[sim], wash_types[sim], fabric_types[sim]) for sim in range(num_simulations)]
+
+def iter_wash_tasks(mean_interarrival, mean_weight, std_dev_weight):
+    # Unbounded lazy stream with exponential gaps between arrivals, for
+    # long-horizon runs through streaming.simulate_stream
+    arrival_time = 0
+    for i in itertools.count():
+        arrival_time += random.expovariate(1 / mean_interarrival)
+        weight = max(1, int(np.random.normal(mean_weight, std_dev_weight)))
+        fabric_type = random.choice(['cotton', 'polyester', 'silk'])
+        wash_type = random.choice(['quick', 'normal', 'heavy'])
+        yield WashingTask(user_id=i + 1, weight=weight, fabric_type=fabric_type, wash_type=wash_type, arrival_time=arrival_time)
+
+def simulate_washing(env, tasks, scheduling_algorithm, time_slice=3, progress=None, progress_step=1):
+    # Service runs as one timeout per decision point (completion, quantum end or,
+    # for SRTN, the next arrival). Pass a progress list to also sample
+    # (time, user_id, remaining minutes) every progress_step minutes for plotting.
+    # A TaskStore is read through plain records, which are cheaper per event.
+    if isinstance(tasks, TaskStore):
+        tasks = tasks.records()
     machine = simpy.Resource(env, capacity=1)
     order = []
     data = []  # Data collection for regression analysis
     completion_times = []
 
+    def serve(env, task, run_time, remaining_time):
+        if progress is None:
+            yield env.timeout(run_time)
+            return
+        start_time = env.now
+        end_time = start_time + run_time
+        while env.now < end_time:
+            progress.append((env.now, task.user_id, remaining_time - (env.now - start_time)))
+            yield env.timeout(min(progress_step, end_time - env.now))
+
+    def finish(env, task, start_time):
+        completion_time = env.now
+        data.append((task.weight, task.wash_duration, task.fabric_type, task.wash_type, completion_time - start_time))
+        completion_times.append(completion_time - task.arrival_time)
+
     def washing_process(env, task, machine, order, data):
         yield env.timeout(task.arrival_time)
         with machine.request() as request:
             yield request
             start_time = env.now
             order.append(task.user_id)
-            for remaining_time in range(task.wash_duration, 0, -1):
-                yield env.timeout(1)
-            completion_time = env.now
-            data.append((task.weight, task.wash_duration, task.fabric_type, task.wash_type, completion_time - start_time))
-            completion_times.append(completion_time - task.arrival_time)
+            yield from serve(env, task, task.wash_duration, task.wash_duration)
+            finish(env, task, start_time)
 
-    def rr_process(env, tasks, time_slice, machine, order, data):
-        task_queue = sorted(tasks, key=lambda task: task.arrival_time)
+    def dispatch_process(env, tasks, machine, order, pick, quantum=None, preemptive=False, order_on_start=False):
+        # One process serves the whole queue, waking only at arrivals and completions
+        arrivals = deque(sorted(tasks, key=lambda task: task.arrival_time))
         remaining_times = {task.user_id: task.wash_duration for task in tasks}
-        task_end_times = {task.user_id: None for task in tasks}
-
-        while task_queue:
-            for task in list(task_queue):
-                if task.arrival_time <= env.now:
-                    with machine.request() as request:
-                        yield request
-                        run_time = min(time_slice, remaining_times[task.user_id])
-                        for remaining_time in range(run_time, 0, -1):
-                            yield env.timeout(1)
-                            remaining_times[task.user_id] -= 1
-                            if remaining_times[task.user_id] == 0:
-                                task_end_times[task.user_id] = env.now
-                                task_queue.remove(task)
-                                break
-                        if task.user_id not in order:
-                            order.append(task.user_id)
-                else:
-                    yield env.timeout(task.arrival_time - env.now)
-            if not task_queue:
-                break
+        start_times = {}
+        ready = deque()
+
+        def admit():
+            while arrivals and arrivals[0].arrival_time <= env.now:
+                ready.append(arrivals.popleft())
+
+        while arrivals or ready:
+            admit()
+            if not ready:
+                yield env.timeout(arrivals[0].arrival_time - env.now)
+                continue
+            task = pick(ready, remaining_times)
+            ready.remove(task)
+            run_time = remaining_times[task.user_id]
+            if quantum is not None:
+                run_time = min(quantum, run_time)
+            if preemptive and arrivals:
+                run_time = min(run_time, arrivals[0].arrival_time - env.now)
+            with machine.request() as request:
+                yield request
+                if task.user_id not in start_times:
+                    start_times[task.user_id] = env.now
+                    if order_on_start:
+                        order.append(task.user_id)
+                yield from serve(env, task, run_time, remaining_times[task.user_id])
+            remaining_times[task.user_id] -= run_time
+            admit()  # Arrivals during the slice queue ahead of the preempted task
+            if remaining_times[task.user_id] > 0:
+                ready.append(task)
+            else:
+                if not order_on_start:
+                    order.append(task.user_id)
+                finish(env, task, start_times[task.user_id])
+
+    def rr_process(env, tasks, time_slice, machine, order, data):
+        return dispatch_process(env, tasks, machine, order, lambda ready, remaining_times: ready[0], quantum=time_slice, order_on_start=True)
 
     def fcfs_process(env, tasks, machine, order, data):
         for task in tasks:
@@ -97,53 +174,16 @@ def simulate_washing(env, tasks, scheduling_algorithm, time_slice=3):
             env.process(washing_process(env, task, machine, order, data))
 
     def srtn_process(env, tasks, machine, order, data):
-        task_queue = sorted(tasks, key=lambda task: task.arrival_time)
-        remaining_times = {task.user_id: task.wash_duration for task in tasks}
+        def shortest_remaining(ready, remaining_times):
+            return min(ready, key=lambda t: (remaining_times[t.user_id], t.arrival_time))
 
-        while task_queue:
-            task_queue.sort(key=lambda t: (remaining_times[t.user_id], t.arrival_time))
-            for task in list(task_queue):
-                if task.arrival_time <= env.now:
-                    with machine.request() as request:
-                        yield request
-                        run_time = remaining_times[task.user_id]
-                        for remaining_time in range(run_time, 0, -1):
-                            yield env.timeout(1)
-                            remaining_times[task.user_id] -= 1
-                            if remaining_times[task.user_id] == 0:
-                                order.append(task.user_id)
-                                task_queue.remove(task)
-                                break
-                else:
-                    yield env.timeout(task.arrival_time - env.now)
-            if not task_queue:
-                break
+        return dispatch_process(env, tasks, machine, order, shortest_remaining, preemptive=True)
 
     def hrrn_process(env, tasks, machine, order, data):
-        task_queue = sorted(tasks, key=lambda task: task.arrival_time)
-        remaining_times = {task.user_id: task.wash_duration for task in tasks}
-        arrival_times = {task.user_id: task.arrival_time for task in tasks}
-
-        while task_queue:
-            available_tasks = [task for task in task_queue if task.arrival_time <= env.now]
-            if available_tasks:
-                hrrn_values = [(task, ((env.now - task.arrival_time + remaining_times[task.user_id]) / remaining_times[task.user_id])) for task in available_tasks]
-                hrrn_values.sort(key=lambda x: x[1], reverse=True)
-                highest_task = hrrn_values[0][0]
-                with machine.request() as request:
-                    yield request
-                    run_time = remaining_times[highest_task.user_id]
-                    for remaining_time in range(run_time, 0, -1):
-                        yield env.timeout(1)
-                        remaining_times[highest_task.user_id] -= 1
-                        if remaining_times[highest_task.user_id] == 0:
-                            order.append(highest_task.user_id)
-                            task_queue.remove(highest_task)
-                            break
-            else:
-                yield env.timeout(min(task.arrival_time for task in task_queue) - env.now)
-            if not task_queue:
-                break
+        def highest_response_ratio(ready, remaining_times):
+            return max(ready, key=lambda t: ((env.now - t.arrival_time + t.wash_duration) / t.wash_duration, -t.arrival_time))
+
+        return dispatch_process(env, tasks, machine, order, highest_response_ratio)
 
     def brute_force_process(env, tasks, machine, order, data):
         sorted_tasks = sorted(tasks, key=lambda task: (task.arrival_time, task.wash_duration))
@@ -157,66 +197,189 @@ def simulate_washing(env, tasks, scheduling_algorithm, time_slice=3):
     elif scheduling_algorithm == 'RR':
         env.process(rr_process(env, tasks, time_slice, machine, order, data))
     elif scheduling_algorithm == 'SRTN':
-        srtn_process(env, tasks, machine, order, data)
+        env.process(srtn_process(env, tasks, machine, order, data))
     elif scheduling_algorithm == 'HRRN':
-        hrrn_process(env, tasks, machine, order, data)
+        env.process(hrrn_process(env, tasks, machine, order, data))
     elif scheduling_algorithm == 'Brute Force':
         brute_force_process(env, tasks, machine, order, data)
 
     env.run()
-    # Calculate the number of matches between SJF/FCFS order and optimal order
-    def calculate_order_matches(optimal_order, algorithm_order):
-        matches = sum(1 for x, y in zip(optimal_order, algorithm_order) if x == y)
-
-# Calculate optimal order (assuming tasks are sorted based on arrival time)
-optimal_order = [task.user_id for task in sorted(tasks, key=lambda x: x.arrival_time)]
-
-# Count the number of matches for each algorithm
-fcfs_matches = calculate_order_matches(optimal_order, order_fcfs)
-sjf_matches = calculate_order_matches(optimal_order, order_sjf)
-
-# Display the number of matches
-st.write(f"Optimal Order Matches for FCFS and SJF")
-st.write(f"FCFS matches with optimal order {fcfs_matches} times.")
-st.write(f"SJF matches with optimal order {sjf_matches} times.")
-
     return order, completion_times
 
+def seed_simulation(seed, sim):
+    # Each replicate's task set is fixed by (seed, sim), so its cached results stay valid
+    np.random.seed([seed, sim])
+    random.seed(seed * 1000003 + sim)
 
+@st.cache_resource
+def get_result_cache():
+    # Shared across reruns; holds every algorithm's result for a full adaptive run at the replicate cap
+    return ResultCache(maxsize=MAX_SIMULATIONS * len(ALGORITHMS))
 
 # Streamlit interface
-st.title('Washing Machine Scheduling Simulation')
-
-st.sidebar.header('Input Parameters')
-num_users = st.sidebar.slider('Number of Users', 1, 200, 5)
-mean_weight = st.sidebar.slider('Mean Weight of Clothes (kg)', 1, 10, 5)
-std_dev_weight = st.sidebar.slider('Standard Deviation of Weight (kg)', 1, 5, 2)
-scheduling_algorithms = st.sidebar.multiselect('Scheduling Algorithms', ['FCFS', 'SJF', 'RR', 'SRTN', 'HRRN', 'Brute Force'], default=['FCFS', 'SJF'])
-time_slice = st.sidebar.slider('Time Slice for Round Robin', 1, 10, 3)
-num_simulations = st.sidebar.slider('Number of Simulations', 1, 100, 10)
-
-# Data collection
-completion_times_all = {alg: [] for alg in scheduling_algorithms}
-
-for sim in range(num_simulations):
-    tasks = generate_wash_tasks(num_users, mean_weight, std_dev_weight)
-    for algorithm in scheduling_algorithms:
-        env = simpy.Environment()
-        order, completion_times = simulate_washing(env, tasks, algorithm, time_slice)
-        completion_times_all[algorithm].extend(completion_times)
-
-# Aggregate completion times for each algorithm
-completion_times_aggregated = {alg: np.histogram(times, bins=20, range=(0, max(times)))[0] for alg, times in completion_times_all.items()}
-
-# Plot completion times as line plot
-fig, ax = plt.subplots()
-for algorithm in scheduling_algorithms:
-    ax.plot(range(1, 21), completion_times_aggregated[algorithm], label=algorithm)
-ax.set_xlabel('Bins')
-ax.set_ylabel('Frequency')
-ax.set_title('Completion Times for Different Scheduling Algorithms')
-ax.legend()
-
-st.pyplot(fig)
-
-
+def main():
+    st.title('Washing Machine Scheduling Simulation')
+
+    st.sidebar.header('Input Parameters')
+    num_users = st.sidebar.slider('Number of Users', 1, 200, 5)
+    mean_weight = st.sidebar.slider('Mean Weight of Clothes (kg)', 1, 10, 5)
+    std_dev_weight = st.sidebar.slider('Standard Deviation of Weight (kg)', 1, 5, 2)
+    scheduling_algorithms = st.sidebar.multiselect('Scheduling Algorithms', ALGORITHMS, default=['FCFS', 'SJF'])
+    time_slice = st.sidebar.slider('Time Slice for Round Robin', 1, 10, 3)
+    adaptive_replication = st.sidebar.checkbox('Adaptive Number of Simulations', value=False)
+    if adaptive_replication:
+        # Simulations are added in batches until the confidence interval is narrow enough
+        target = st.sidebar.slider('Target Relative Half-Width', 0.01, 0.5, 0.05)
+        target_metric = st.sidebar.selectbox('Target Metric', adaptive.METRICS)
+        target_choice = st.sidebar.selectbox('Precision Target', adaptive.target_choices(scheduling_algorithms))
+        batch_size = st.sidebar.slider('Simulations per Batch', 1, 50, 10)
+        max_simulations = st.sidebar.slider('Maximum Number of Simulations', 1, MAX_SIMULATIONS, 200)
+    else:
+        num_simulations = st.sidebar.slider('Number of Simulations', 1, 100, 10)
+    antithetic = st.sidebar.checkbox('Antithetic Replicates', value=False)
+    seed = st.sidebar.number_input('Random Seed', min_value=0, value=0)
+    show_progress = st.sidebar.checkbox('Show Wash Progress (first simulation)', value=False)
+    show_instrumentation = st.sidebar.checkbox('Show Instrumentation', value=False)
+
+    if not adaptive_replication:
+        # A fixed count still runs in batches, so partial results can be shown
+        target, target_metric, target_choice = None, 'Completion Time', adaptive.EVERY_MEAN
+        batch_size, max_simulations = FIXED_BATCH_SIZE, num_simulations
+    if not scheduling_algorithms:
+        return
+
+    result_cache = get_result_cache()
+    params = {'time_slice': time_slice}
+
+    def work(run):
+        # Runs on the background executor and publishes a snapshot after every batch.
+        # None keeps plain SimPy environments, so the counters cost nothing unless shown.
+        instrumentation = Instrumentation() if show_instrumentation else None
+        completion_times_all = {alg: [] for alg in scheduling_algorithms}
+        observations_all = []
+        first_tasks = []
+
+        def run_batch(first, count):
+            # A batch is drawn in one go from its own Generator, so a replicate's task
+            # set is fixed by (seed, first, count, sim, antithetic). Every algorithm
+            # runs the same task set, so comparisons use common random numbers.
+            with phase(instrumentation, 'generate'):
+                task_stores = generate_wash_task_stores(count, num_users, mean_weight, std_dev_weight, np.random.default_rng([seed, first]), antithetic)
+            if first == 0:
+                first_tasks.append(task_stores[0])
+
+            observations = []
+            for sim, tasks in enumerate(task_stores):
+                task_set = (seed, first, count, sim, antithetic, num_users, mean_weight, std_dev_weight)
+                mean_duration = tasks.duration.mean()
+                times = {metric: {} for metric in adaptive.METRICS}
+                for algorithm in scheduling_algorithms:
+                    with phase(instrumentation, 'simulate'):
+                        if instrumentation is None:
+                            order, completion_times = result_cache.get_or_compute(task_set, algorithm, params, lambda: simulate_washing(environment(None), tasks, algorithm, time_slice))
+                        else:
+                            # Measured runs always simulate: a cached result would count no events and no time
+                            order, completion_times = simulate_washing(environment(instrumentation), tasks, algorithm, time_slice)
+                    completion_times_all[algorithm].extend(completion_times)
+                    times['Completion Time'][algorithm] = np.mean(completion_times)
+                    times['Waiting Time'][algorithm] = np.mean(completion_times) - mean_duration
+                observations.append(times)
+            observations_all.extend(observations)
+            return observations
+
+        def snapshot(running, replicates, met=None):
+            return {
+                'completion_times': {alg: list(times) for alg, times in completion_times_all.items()},
+                'observations': list(observations_all),
+                'running': {name: copy.copy(r) for name, r in running.items()},
+                'num_simulations': replicates,
+                'met': met,
+                'first_tasks': first_tasks,
+                'instrumentation': instrumentation,
+            }
+
+        statistics = adaptive.statistics_for(scheduling_algorithms, target_choice)
+        running, replicates, met = adaptive.run_sequential(lambda first, count: [times[target_metric] for times in run_batch(first, count)],
+                                                           statistics, target, batch_size=batch_size, max_replicates=max_simulations, antithetic=antithetic,
+                                                           progress=lambda running, replicates: run.publish(snapshot(running, replicates)), cancelled=run.cancelled)
+        return snapshot(running, replicates, met)
+
+    def render(state, finished):
+        if state is None:
+            st.write('Starting simulations...')
+            return
+        # The run's counters are final once it finishes; this redraw's own work is timed separately
+        run_instrumentation = state['instrumentation'] if finished else None
+        instrumentation = Instrumentation() if run_instrumentation is not None else None
+        num_simulations = state['num_simulations']
+        if not finished:
+            st.progress(num_simulations / max_simulations, text=f'{num_simulations} of up to {max_simulations} simulations')
+
+        if target is not None:
+            running = state['running']
+            st.subheader('Adaptive Replication')
+            if state['met']:
+                st.write(f'Target relative half-width of {target:.0%} reached after {num_simulations} simulations')
+            elif finished:
+                st.warning(f'Target relative half-width of {target:.0%} not reached within {num_simulations} simulations')
+            st.table(pd.DataFrame({
+                f'Mean {target_metric}': {name: r.mean for name, r in running.items()},
+                '95% Half-Width': {name: adaptive.half_width(r) for name, r in running.items()},
+                'Relative Half-Width': {name: adaptive.relative_half_width(r) for name, r in running.items()},
+            }))
+
+        if len(scheduling_algorithms) > 1 or antithetic:
+            # How many independent, unpaired simulations one simulation here is worth
+            st.subheader('Variance Reduction')
+            st.table(pd.DataFrame({metric: variance.reduction_factors([o[metric] for o in state['observations']], scheduling_algorithms, antithetic) for metric in adaptive.METRICS}))
+
+        # A run cancelled before its first batch has no completion times to plot
+        if all(state['completion_times'].values()):
+            # Aggregate completion times for each algorithm
+            with phase(instrumentation, 'aggregate'):
+                completion_times_aggregated = {alg: np.histogram(times, bins=20, range=(0, max(times)))[0] for alg, times in state['completion_times'].items()}
+
+            # Plot completion times as line plot
+            with phase(instrumentation, 'render'):
+                fig, ax = plt.subplots()
+                for algorithm in scheduling_algorithms:
+                    ax.plot(range(1, 21), completion_times_aggregated[algorithm], label=algorithm)
+                ax.set_xlabel('Bins')
+                ax.set_ylabel('Frequency')
+                ax.set_title('Completion Times for Different Scheduling Algorithms')
+                ax.legend()
+
+                st.pyplot(fig)
+                plt.close(fig)  # The page redraws on every poll
+
+        # Minute-by-minute progress is only sampled when asked for, once the run is done
+        if finished and show_progress and state['first_tasks']:
+            tasks = state['first_tasks'][0]
+            for algorithm in scheduling_algorithms:
+                progress = []
+                with phase(instrumentation, 'simulate'):
+                    simulate_washing(environment(instrumentation), tasks, algorithm, time_slice, progress=progress)
+                with phase(instrumentation, 'render'):
+                    times, user_ids, remaining_times = zip(*progress) if progress else ((), (), ())
+                    fig, ax = plt.subplots()
+                    ax.scatter(times, user_ids, c=remaining_times, s=4)
+                    ax.set_xlabel('Time (minutes)')
+                    ax.set_ylabel('User')
+                    ax.set_title(f'Wash Progress ({algorithm})')
+                    st.pyplot(fig)
+                    plt.close(fig)
+
+        if instrumentation is not None:
+            st.sidebar.subheader('Instrumentation')
+            shown = lambda name, value: f'{value:.4f} s' if name.endswith('_seconds') else str(value)
+            redraw = instrumentation.as_dict()
+            counters = {name: [shown(name, value), shown(name, redraw[name])] for name, value in run_instrumentation.as_dict().items()}
+            st.sidebar.table(pd.DataFrame.from_dict(counters, orient='index', columns=['Run', 'This Redraw']))
+
+    # Simulations run in the background; changing an input cancels the run and starts a new one
+    key = (num_users, mean_weight, std_dev_weight, tuple(scheduling_algorithms), time_slice, target, target_metric, target_choice,
+           batch_size, max_simulations, antithetic, seed, show_instrumentation)
+    background.show(background.session_run('wash_run', key, work), render)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import engine
+
+# Exact solver for sequencing tasks with release dates on one machine so that
+# the total completion (turnaround) time is minimal. Each order is served as a
+# sequence: a task starts at max(arrival, previous finish).
+#
+# Depth-first branch-and-bound over task indices in lexicographic order, so
+# among equally good orders it returns the one itertools.permutations would
+# reach first. Pruning:
+#   - upper bound from the FCFS and SJF sequences,
+#   - lower bound from the preemptive SRTN relaxation of the remaining tasks,
+#   - a task is never placed next if some other task could run to completion
+#     in the idle gap before it starts,
+#   - prefixes over the same subset (bitmask) that finish no earlier with no
+#     smaller partial cost than an earlier prefix are dropped.
+
+EPS = 1e-9
+
+
+def sequence_total_time(arrivals, durations, order):
+    now = 0
+    total_time = 0
+    for i in order:
+        now = max(now, arrivals[i]) + durations[i]
+        total_time += now - arrivals[i]
+    return total_time
+
+
+def remaining_lower_bound(arrivals, durations, remaining, now):
+    released = [max(arrivals[i], now) for i in remaining]
+    _, ends, _ = engine.run_srtn(released, [durations[i] for i in remaining])
+    return sum(ends) - sum(arrivals[i] for i in remaining)
+
+
+def optimal_sequence(arrivals, durations):
+    n = len(arrivals)
+    if n == 0:
+        return 0, []
+
+    best_time = float('inf')
+    best_order = None
+    for heuristic in (engine.run_fcfs, engine.run_sjf):
+        _, _, order = heuristic(arrivals, durations)
+        total_time = sequence_total_time(arrivals, durations, order)
+        if total_time < best_time:
+            best_time = total_time
+            best_order = order
+    found = False  # Until a leaf matches the heuristic bound, equal cost still counts
+    frontier = {}  # bitmask -> [(finish time, partial cost)] of prefixes already explored
+    prefix = []
+
+    def dominated(mask, now, cost):
+        entries = frontier.setdefault(mask, [])
+        for finish, partial in entries:
+            if finish <= now + EPS and partial <= cost + EPS:
+                return True
+        entries[:] = [(f, p) for f, p in entries if not (now <= f + EPS and cost <= p + EPS)]
+        entries.append((now, cost))
+        return False
+
+    def search(mask, now, cost):
+        nonlocal best_time, best_order, found
+        if mask == (1 << n) - 1:
+            if cost < best_time - EPS or (not found and cost <= best_time + EPS):
+                best_time = cost
+                best_order = list(prefix)
+                found = True
+            return
+
+        remaining = [i for i in range(n) if not mask >> i & 1]
+        bound = cost + remaining_lower_bound(arrivals, durations, remaining, now)
+        if bound > best_time + EPS or (found and bound >= best_time - EPS):
+            return
+        if dominated(mask, now, cost):
+            return
+
+        # The two earliest possible finishes decide which tasks may go next
+        first = second = float('inf')
+        first_task = None
+        for i in remaining:
+            finish = max(now, arrivals[i]) + durations[i]
+            if finish < first:
+                first, second, first_task = finish, first, i
+            elif finish < second:
+                second = finish
+
+        for i in remaining:
+            start = max(now, arrivals[i])
+            if start >= (second if i == first_task else first):
+                continue
+            prefix.append(i)
+            finish = start + durations[i]
+            search(mask | 1 << i, finish, cost + finish - arrivals[i])
+            prefix.pop()
+
+    search(0, 0, 0)
+    return best_time, best_order
@@ -0,0 +1,110 @@
+import os
+import re
+import sys
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Append-only columnar results store replacing data.csv / simulation_data.csv.
+# A store is a directory of zstd-compressed Parquet files; every writer flush
+# adds a new part file, so earlier results are never rewritten. A part is
+# written under a hidden name, which readers skip, and renamed once complete,
+# so a writer killed mid-flush never leaves a part that cannot be read. The algorithm
+# is a dictionary-encoded column with fixed codes (its index in ALGORITHMS)
+# and loads as a pandas categorical.
+
+ALGORITHMS = ['FCFS', 'SJF', 'SRTF', 'SRTN', 'RR', 'HRRN', 'Priority']
+
+SCHEMA = pa.schema([
+    ('Algorithm', pa.dictionary(pa.int8(), pa.string())),
+    ('Avg Waiting Time', pa.float64()),
+    ('Avg Turnaround Time', pa.float64()),
+    ('Avg Completion Time', pa.float64()),
+    ('Num Customers', pa.int32()),
+    ('Num Machines', pa.int32()),
+    ('Arrival Time Mean', pa.float64()),
+    ('Burst Time Mean', pa.float64()),
+    ('Burst Time Std Dev', pa.float64()),  # Empty for exponential bursts
+])
+
+# Old CSV headers that map onto a store column
+CSV_COLUMNS = {'Num Users': 'Num Customers'}
+
+
+def algorithm_code(label):
+    # Accepts 'SJF' as well as the CSV labels like '🔍 Shortest Job Next (SJF)'
+    match = re.search(r'\(([^()]+)\)\s*$', label)
+    return ALGORITHMS.index(match.group(1) if match else label.strip())
+
+
+class ResultsWriter:
+    def __init__(self, path, batch_size=10000, compression='zstd'):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.compression = compression
+        self.columns = {field.name: [] for field in SCHEMA}
+
+    def writerow(self, row):
+        for name, values in self.columns.items():
+            value = row.get(name)
+            if name == 'Algorithm':
+                value = algorithm_code(value)
+            values.append(value)
+        if len(self.columns['Algorithm']) >= self.batch_size:
+            self.flush()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self):
+        if not self.columns['Algorithm']:
+            return
+        arrays = []
+        for field in SCHEMA:
+            values = self.columns[field.name]
+            if field.name == 'Algorithm':
+                arrays.append(pa.DictionaryArray.from_arrays(pa.array(values, pa.int8()), pa.array(ALGORITHMS)))
+            else:
+                arrays.append(pa.array(values, field.type))
+            values.clear()
+        name = f'part-{uuid.uuid4().hex}.parquet'
+        temporary = os.path.join(self.path, '.' + name)
+        pq.write_table(pa.Table.from_arrays(arrays, schema=SCHEMA), temporary, compression=self.compression)
+        os.replace(temporary, os.path.join(self.path, name))
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_results(path, columns=None, algorithms=None):
+    filters = None
+    if algorithms is not None:
+        filters = [('Algorithm', 'in', list(algorithms))]
+    table = pq.read_table(path, columns=columns, filters=filters, schema=SCHEMA)
+    return table.to_pandas()
+
+
+def convert_csv(csv_filename, path, chunksize=100000):
+    with ResultsWriter(path) as writer:
+        for chunk in pd.read_csv(csv_filename, chunksize=chunksize):
+            chunk = chunk.rename(columns=CSV_COLUMNS)
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            writer.writerows(chunk.to_dict('records'))
+
+
+if __name__ == "__main__":
+    # python results.py data.csv simulation_data.csv [store directory]
+    filenames = [name for name in sys.argv[1:] if name.endswith('.csv')]
+    path = next((name for name in sys.argv[1:] if not name.endswith('.csv')), 'results')
+    for filename in filenames:
+        convert_csv(filename, path)
+        print(f"Converted {filename} into {path}")
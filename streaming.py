@@ -0,0 +1,80 @@
+import math
+import sys
+import simpy
+
+# Unbounded-horizon simulation. Arrivals come from a lazy generator and a single
+# source process injects each task when its arrival time comes round, so only
+# the tasks currently in the system are held. Waiting and turnaround times are
+# folded into running statistics instead of being collected in lists, which
+# keeps a long run (e.g. a year of laundromat traffic) in constant memory.
+
+
+class RunningStats:
+    # Welford's online mean and variance, plus min and max
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def as_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'variance': self.variance, 'min': self.min, 'max': self.max}
+
+
+def simulate_stream(env, arrivals, duration, discipline='FCFS', machines=1, until=None):
+    # arrivals must be ordered by arrival_time; duration(task) gives its service time.
+    # SJF is non-preemptive: a freed machine takes the shortest waiting task.
+    if discipline not in ('FCFS', 'SJF'):
+        raise ValueError(f"Invalid discipline for streaming: {discipline}")
+    machine = simpy.PriorityResource(env, capacity=machines)
+    waiting = RunningStats()
+    turnaround = RunningStats()
+
+    def customer(env, task):
+        service_time = duration(task)
+        with machine.request(priority=service_time if discipline == 'SJF' else 0) as request:
+            yield request
+            waiting.add(env.now - task.arrival_time)
+            yield env.timeout(service_time)
+        turnaround.add(env.now - task.arrival_time)
+
+    def source(env):
+        for task in arrivals:
+            if until is not None and task.arrival_time > until:
+                return
+            yield env.timeout(task.arrival_time - env.now)
+            env.process(customer(env, task))
+
+    env.process(source(env))
+    env.run(until=until)
+    return waiting, turnaround
+
+
+if __name__ == "__main__":
+    # python streaming.py [machines] [mean minutes between arrivals]: one year of laundromat traffic
+    import new
+
+    machines = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    mean_interarrival = float(sys.argv[2]) if len(sys.argv) > 2 else 15
+    year = 365 * 24 * 60
+    for discipline in ('FCFS', 'SJF'):
+        new.seed_simulation(0, 0)
+        arrivals = new.iter_wash_tasks(mean_interarrival, 5, 2)
+        waiting, turnaround = simulate_stream(simpy.Environment(), arrivals, lambda task: task.wash_duration, discipline, machines, until=year)
+        print(f"{discipline} waiting: {waiting.as_dict()}")
+        print(f"{discipline} turnaround: {turnaround.as_dict()}")
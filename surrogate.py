@@ -0,0 +1,201 @@
+import itertools
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+from scipy import stats
+import results
+import sweep
+from streaming import RunningStats
+
+# Surrogate for bank.py's average waiting time: Poisson arrivals and normal
+# burst times truncated to whole minutes, as bank.generate_tasks_poisson draws
+# them. One least-squares model per discipline: a cubic polynomial in the
+# standardized customers, arrival mean, burst mean, burst standard deviation,
+# 1 / machines and offered load, fitted to the rows a sweep of BANK_STUDY
+# wrote to its results store or CSV (rows without a Burst Time Std Dev, like
+# data.csv's, have exponential bursts and are not used). Predictions come
+# with a 95% confidence interval on the mean from the fit's covariance, the
+# same kind of interval a simulation reports; the replicate noise of single
+# training points is not part of it. A query outside the training box, for an
+# unknown discipline or a poorly fitting model, or with too wide an interval
+# falls back to simulating the point.
+
+MODEL_FILE = 'surrogate.json'
+DEGREE = 3
+MIN_ROWS = 100  # Fewer rows per discipline are not fitted
+MAX_RELATIVE_UNCERTAINTY = 0.2  # Of the larger of the prediction and the burst mean
+MIN_R2 = 0.95  # Lack-of-fit check: a discipline's model explaining less is never trusted
+FALLBACK_REPLICATES = 200
+
+# The ranges bank.py's inputs are expected in; 20 replicates per point
+BANK_STUDY = {
+    'parameters': {
+        'Num Customers': {'low': 1, 'high': 20, 'integer': True},
+        'Arrival Time Mean': {'low': 0.5, 'high': 10},
+        'Burst Time Mean': {'low': 1, 'high': 10},
+        'Burst Time Std Dev': {'low': 0, 'high': 5},
+    },
+    'points': 5000,
+    'disciplines': ['FCFS', 'SJF', 'SRTN', 'HRRN'],
+    'replicates': 20,
+    'seed': 0,
+}
+
+
+def features(customers, machines, arrival_mean, burst_mean, burst_std_dev):
+    customers, machines, arrival_mean, burst_mean, burst_std_dev = (np.asarray(value, dtype=np.float64)
+                                                                    for value in (customers, machines, arrival_mean, burst_mean, burst_std_dev))
+    return np.stack([customers, arrival_mean, burst_mean, burst_std_dev, 1 / machines, burst_mean / (arrival_mean * machines)], axis=-1)
+
+
+def exponents(width, degree=DEGREE):
+    # One row per monomial of width variables up to degree, constant first
+    rows = [np.zeros(width, dtype=int)]
+    for k in range(1, degree + 1):
+        for combination in itertools.combinations_with_replacement(range(width), k):
+            rows.append(np.bincount(combination, minlength=width))
+    return np.array(rows)
+
+
+def polynomial(z, powers):
+    return np.prod(z[..., None, :] ** powers, axis=-1)
+
+
+def fit(frame, degree=DEGREE):
+    models = {}
+    for discipline, rows in frame.groupby('Algorithm', observed=True):
+        if len(rows) < MIN_ROWS:
+            continue
+        raw = features(*(rows[name].values for name in sweep.POINT_COLUMNS))
+        center, scale = raw.mean(axis=0), raw.std(axis=0)
+        scale[scale == 0] = 1
+        X = polynomial((raw - center) / scale, exponents(raw.shape[1], degree))
+        y = rows['Avg Waiting Time'].values
+        coefficients, *_ = np.linalg.lstsq(X, y, rcond=None)
+        dof = max(1, len(y) - X.shape[1])
+        sigma2 = float(np.sum((y - X @ coefficients) ** 2) / dof)
+        models[str(discipline)] = {
+            'center': center.tolist(),
+            'scale': scale.tolist(),
+            'coefficients': coefficients.tolist(),
+            'covariance': (sigma2 * np.linalg.pinv(X.T @ X)).tolist(),
+            't': float(stats.t.ppf(0.975, dof)),
+            'bounds': {name: [float(rows[name].min()), float(rows[name].max())] for name in sweep.POINT_COLUMNS},
+            'rows': len(y),
+            'r2': float(1 - sigma2 * dof / (np.var(y) * len(y))) if np.var(y) > 0 else 1.0,
+        }
+    return models
+
+
+def load_frame(output):
+    # The sweep output's rows for normal bursts, each already averaged over its replicates
+    if output.endswith('.csv'):
+        frame = pd.read_csv(output, float_precision='round_trip').rename(columns=results.CSV_COLUMNS)
+    else:
+        frame = results.load_results(output)
+    if 'Burst Time Std Dev' not in frame:
+        frame['Burst Time Std Dev'] = np.nan
+    frame['Num Machines'] = frame.get('Num Machines', pd.Series(1, index=frame.index)).fillna(1)
+    frame = frame.dropna(subset=sweep.POINT_COLUMNS + ['Avg Waiting Time'])
+    if frame.empty:
+        raise ValueError(f"{output} has no rows with a Burst Time Std Dev: train on a sweep of BANK_STUDY")
+    frame['Algorithm'] = [results.ALGORITHMS[results.algorithm_code(str(label))] for label in frame['Algorithm']]
+    return frame
+
+
+class Surrogate:
+    def __init__(self, models, degree=DEGREE):
+        self.degree = degree
+        self.powers = exponents(features(1, 1, 1, 1, 1).shape[-1], degree)
+        self.models = {}
+        for discipline, model in models.items():
+            model = dict(model)
+            for name in ('center', 'scale', 'coefficients', 'covariance'):
+                model[name] = np.asarray(model[name])
+            self.models[discipline] = model
+
+    @classmethod
+    def train(cls, output, degree=DEGREE):
+        return cls(fit(load_frame(output), degree), degree)
+
+    @classmethod
+    def load(cls, filename=MODEL_FILE):
+        with open(filename) as file:
+            saved = json.load(file)
+        return cls(saved['models'], saved['degree'])
+
+    def save(self, filename=MODEL_FILE):
+        models = {discipline: {name: value.tolist() if isinstance(value, np.ndarray) else value for name, value in model.items()}
+                  for discipline, model in self.models.items()}
+        with open(filename, 'w') as file:
+            json.dump({'degree': self.degree, 'models': models}, file)
+
+    def model(self, discipline):
+        # SRTF and SRTN name the same discipline
+        if discipline in self.models:
+            return self.models[discipline]
+        engine_discipline = sweep.DISCIPLINES.get(discipline)
+        if engine_discipline is None:
+            return None
+        return next((model for name, model in self.models.items() if sweep.DISCIPLINES.get(name) == engine_discipline), None)
+
+    def predict(self, discipline, customers, machines, arrival_mean, burst_mean, burst_std_dev):
+        # (mean, 95% half-width), or None outside what the model was trained on
+        model = self.model(discipline)
+        if model is None:
+            return None
+        point = dict(zip(sweep.POINT_COLUMNS, (customers, machines, arrival_mean, burst_mean, burst_std_dev)))
+        if any(not low <= point[name] <= high for name, (low, high) in model['bounds'].items()):
+            return None
+        x = polynomial((features(customers, machines, arrival_mean, burst_mean, burst_std_dev) - model['center']) / model['scale'], self.powers)
+        prediction = float(x @ model['coefficients'])
+        half_width = model['t'] * float(np.sqrt(max(0.0, x @ model['covariance'] @ x)))
+        return max(0.0, prediction), half_width
+
+
+def simulate(discipline, customers, machines, arrival_mean, burst_mean, burst_std_dev, replicates=FALLBACK_REPLICATES, seed=0):
+    # The study's model run directly: (mean, 95% half-width) over the replicates
+    if discipline not in sweep.DISCIPLINES:
+        raise ValueError(f"Invalid scheduling discipline: {discipline}")
+    point = sweep.point_tuple((customers, machines, arrival_mean, burst_mean, burst_std_dev))
+    waiting = RunningStats()
+    for replicate in range(replicates):
+        waiting.add(sweep.run_unit((point, discipline, replicate, seed))[0])
+    half_width = stats.t.ppf(0.975, replicates - 1) * np.sqrt(waiting.variance / replicates) if replicates > 1 else np.inf
+    return waiting.mean, float(half_width)
+
+
+def trusted_prediction(surrogate, discipline, customers, machines, arrival_mean, burst_mean, burst_std_dev, max_relative_uncertainty=MAX_RELATIVE_UNCERTAINTY):
+    # The surrogate's (mean, 95% half-width), or None where the point has to be simulated
+    if surrogate is None or surrogate.model(discipline) is None or surrogate.model(discipline)['r2'] < MIN_R2:
+        return None
+    predicted = surrogate.predict(discipline, customers, machines, arrival_mean, burst_mean, burst_std_dev)
+    if predicted is None or predicted[1] > max_relative_uncertainty * max(predicted[0], burst_mean):
+        return None
+    return predicted
+
+
+def estimate(surrogate, discipline, customers, machines, arrival_mean, burst_mean, burst_std_dev, max_relative_uncertainty=MAX_RELATIVE_UNCERTAINTY):
+    # (mean, 95% half-width, source), source being 'surrogate' or 'simulation'
+    predicted = trusted_prediction(surrogate, discipline, customers, machines, arrival_mean, burst_mean, burst_std_dev, max_relative_uncertainty)
+    if predicted is not None:
+        return (*predicted, 'surrogate')
+    return (*simulate(discipline, customers, machines, arrival_mean, burst_mean, burst_std_dev), 'simulation')
+
+
+if __name__ == "__main__":
+    # python surrogate.py [sweep output.csv | store directory] [surrogate.json]
+    # Runs (or resumes) BANK_STUDY into the output, then trains on it
+    sources = [arg for arg in sys.argv[1:] if not arg.endswith('.json')]
+    targets = [arg for arg in sys.argv[1:] if arg.endswith('.json')]
+    model_file = targets[0] if targets else MODEL_FILE
+    output = sources[0] if sources else 'bank_sweep'
+    written, simulated = sweep.run_sweep(BANK_STUDY, output)
+    print(f"Simulated {simulated} work units; wrote {written} rows to {output}")
+    surrogate = Surrogate.train(output)
+    surrogate.save(model_file)
+    for discipline, model in surrogate.models.items():
+        print(f"{discipline:<6} rows={model['rows']:<7} r2={model['r2']:.3f} machines={model['bounds']['Num Machines']}")
+    print(f"Saved {len(surrogate.models)} models to {model_file} ({os.path.getsize(model_file) / 1024:.0f} KiB)")
@@ -0,0 +1,225 @@
+import csv
+import hashlib
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import engine
+import results
+
+# Resumable parameter sweeps. A spec declares the grid; the sweep is split into
+# (point, discipline, replicate) work units run across processes. Every finished
+# unit is appended to a checkpoint file, so an interrupted sweep picks up where it
+# stopped, and (point, discipline) rows already in the output are not rerun.
+# Output is a CSV file (like data.csv) or a results.py store directory.
+#
+# A spec maps each parameter to a list of values (a grid axis) or to a range
+# {"low": ..., "high": ..., "integer": false} sampled "points" times per grid
+# combination. Unlisted parameters take their DEFAULTS.
+#
+# Bursts are exponential, as in data.csv, unless the spec gives a Burst Time Std
+# Dev: then they are bank.py's normal durations, truncated to whole minutes of
+# at least one. The exponential rows leave that column empty.
+
+POINT_COLUMNS = ['Num Customers', 'Num Machines', 'Arrival Time Mean', 'Burst Time Mean', 'Burst Time Std Dev']
+OUTPUT_COLUMNS = ['Algorithm', 'Avg Waiting Time', 'Avg Turnaround Time'] + POINT_COLUMNS
+DEFAULTS = {'Num Customers': 5, 'Num Machines': 1, 'Arrival Time Mean': 10.0, 'Burst Time Mean': 10.0, 'Burst Time Std Dev': None}
+INTEGER_COLUMNS = ('Num Customers', 'Num Machines')
+
+# Discipline as written to the output: engine discipline. SRTF is data.csv's name for SRTN.
+DISCIPLINES = {'FCFS': 'FCFS', 'SJF': 'SJF', 'SRTF': 'SRTN', 'SRTN': 'SRTN', 'HRRN': 'HRRN'}
+
+# The study data.csv holds: 5000 random points, one replicate, three disciplines
+DATA_CSV_STUDY = {
+    'parameters': {
+        'Num Customers': {'low': 1, 'high': 5, 'integer': True},
+        'Arrival Time Mean': {'low': 5, 'high': 15},
+        'Burst Time Mean': {'low': 5, 'high': 15},
+    },
+    'points': 5000,
+    'disciplines': ['FCFS', 'SJF', 'SRTF'],
+    'replicates': 1,
+    'seed': 0,
+}
+
+
+def sweep_points(spec):
+    parameters = {name: spec.get('parameters', {}).get(name, [DEFAULTS[name]]) for name in POINT_COLUMNS}
+    unknown = set(spec.get('parameters', {})) - set(POINT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+    axes = [name for name, values in parameters.items() if isinstance(values, list)]
+    ranges = [name for name in POINT_COLUMNS if name not in axes]
+    rng = np.random.default_rng(spec.get('seed', 0))
+
+    points = []
+    for combination in itertools.product(*(parameters[name] for name in axes)):
+        for _ in range(spec.get('points', 1) if ranges else 1):
+            point = dict(zip(axes, combination))
+            for name in ranges:
+                bounds = parameters[name]
+                if bounds.get('integer', name in INTEGER_COLUMNS):
+                    point[name] = int(rng.integers(bounds['low'], bounds['high'], endpoint=True))
+                else:
+                    point[name] = float(rng.uniform(bounds['low'], bounds['high']))
+            points.append(point_tuple(point[name] for name in POINT_COLUMNS))
+    return points
+
+
+def point_tuple(values):
+    # Integer counts, float means, and None for a missing standard deviation
+    return tuple(None if value is None or pd.isna(value) else int(value) if name in INTEGER_COLUMNS else float(value)
+                 for name, value in zip(POINT_COLUMNS, values))
+
+
+def unit_seed(seed, point, replicate):
+    # The task set depends on the point and replicate only, so every discipline
+    # at a point sees the same tasks, whatever order the units run in
+    digest = hashlib.sha1(repr(point).encode()).digest()
+    return np.random.SeedSequence([seed, *np.frombuffer(digest[:16], dtype=np.uint32).tolist(), replicate])
+
+
+def run_unit(unit):
+    # Poisson arrivals with the point's means; exponential bursts, or bank.py's normal ones given a standard deviation
+    point, discipline, replicate, seed = unit
+    num_customers, num_machines, arrival_mean, burst_mean, burst_std_dev = point
+    rng = np.random.default_rng(unit_seed(seed, point, replicate))
+    arrivals = np.cumsum(rng.exponential(arrival_mean, num_customers)).tolist()
+    if burst_std_dev is None:
+        durations = rng.exponential(burst_mean, num_customers).tolist()
+    else:
+        durations = np.maximum(rng.normal(burst_mean, burst_std_dev, num_customers).astype(int), 1).tolist()
+    _, ends, _ = engine.simulate(arrivals, durations, DISCIPLINES[discipline], machines=num_machines)
+    total_turnaround_time, _, total_waiting_time = engine.totals(arrivals, durations, ends)
+    return total_waiting_time / num_customers, total_turnaround_time / num_customers
+
+
+def existing_points(output):
+    # (point, discipline) pairs already in the output
+    if not os.path.exists(output):
+        return set()
+    if output.endswith('.csv'):
+        frame = pd.read_csv(output, float_precision='round_trip')
+    else:
+        frame = results.load_results(output)
+    if frame.empty:
+        return set()
+    frame['Num Machines'] = frame.get('Num Machines', pd.Series(1, index=frame.index)).fillna(1)
+    frame['Burst Time Std Dev'] = frame.get('Burst Time Std Dev', pd.Series(None, index=frame.index, dtype=float))
+    frame = frame.dropna(subset=POINT_COLUMNS[:-1])
+    done = set()
+    for row in frame[['Algorithm'] + POINT_COLUMNS].itertuples(index=False):
+        point = point_tuple(row[1:])
+        done.add((point, results.ALGORITHMS[results.algorithm_code(str(row[0]))]))
+    return done
+
+
+def checkpoint_path(output):
+    return output.rstrip('/\\') + '.checkpoint.jsonl'
+
+
+def load_checkpoint(checkpoint):
+    completed = {}
+    if os.path.exists(checkpoint):
+        with open(checkpoint) as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A line cut short by the interruption
+                unit = (point_tuple(record['point']), record['discipline'], record['replicate'], record['seed'])
+                completed[unit] = (record['waiting'], record['turnaround'])
+    return completed
+
+
+@contextmanager
+def output_writer(output):
+    if output.endswith('.csv'):
+        new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+        # Appending keeps the file's own columns; older sweeps have no Burst Time Std Dev
+        columns = OUTPUT_COLUMNS if new_file else pd.read_csv(output, nrows=0).columns.tolist()
+        with open(output, 'a', newline='', buffering=1) as file:
+            writer = csv.DictWriter(file, columns, extrasaction='ignore')
+            if new_file:
+                writer.writeheader()
+            yield writer
+    else:
+        with results.ResultsWriter(output) as writer:
+            yield writer
+
+
+def output_row(point, discipline, unit_results):
+    row = dict(zip(POINT_COLUMNS, point))
+    row['Algorithm'] = discipline
+    row['Avg Waiting Time'] = float(np.mean([waiting for waiting, _ in unit_results]))
+    row['Avg Turnaround Time'] = float(np.mean([turnaround for _, turnaround in unit_results]))
+    return row
+
+
+def run_sweep(spec, output, checkpoint=None, max_workers=None):
+    checkpoint = checkpoint or checkpoint_path(output)
+    disciplines = spec.get('disciplines', ['FCFS', 'SJF', 'SRTF'])
+    for discipline in disciplines:
+        if discipline not in DISCIPLINES:
+            raise ValueError(f"Invalid scheduling discipline: {discipline}")
+    replicates = spec.get('replicates', 1)
+    seed = spec.get('seed', 0)
+
+    done = existing_points(output)
+    completed = load_checkpoint(checkpoint)
+    todo = [(point, discipline) for point in dict.fromkeys(sweep_points(spec)) for discipline in disciplines if (point, discipline) not in done]
+    if output.endswith('.csv') and os.path.exists(output) and os.path.getsize(output) > 0 and any(point[-1] is not None for point, _ in todo) \
+            and 'Burst Time Std Dev' not in pd.read_csv(output, nrows=0).columns:
+        raise ValueError(f"{output} has no Burst Time Std Dev column; sweep normal bursts into a new output")
+    units = {key: [(*key, replicate, seed) for replicate in range(replicates)] for key in todo}
+    pending = [unit for key in todo for unit in units[key] if unit not in completed]
+    written = 0
+
+    with output_writer(output) as writer, open(checkpoint, 'a') as checkpoint_file:
+        def write_finished(key):
+            nonlocal written
+            if all(unit in completed for unit in units[key]):
+                writer.writerow(output_row(*key, [completed[unit] for unit in units[key]]))
+                written += 1
+
+        # Points finished before an interruption but not yet in the output
+        for key in todo:
+            write_finished(key)
+
+        max_workers = max_workers or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+        try:
+            mapped = executor.map(run_unit, pending, chunksize=max(1, len(pending) // (max_workers * 16))) if executor else map(run_unit, pending)
+            for unit, (waiting, turnaround) in zip(pending, mapped):
+                point, discipline, replicate, _ = unit
+                record = {'point': point, 'discipline': discipline, 'replicate': replicate, 'seed': seed, 'waiting': waiting, 'turnaround': turnaround}
+                checkpoint_file.write(json.dumps(record) + '\n')
+                checkpoint_file.flush()
+                completed[unit] = (waiting, turnaround)
+                write_finished((point, discipline))
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    return written, len(pending)
+
+
+if __name__ == "__main__":
+    # python sweep.py [spec.json] [output.csv | store directory] [max workers]
+    # With no spec, re-runs the data.csv study into data_sweep.csv
+    args = sys.argv[1:]
+    spec_files = [arg for arg in args if arg.endswith('.json')]
+    workers = [int(arg) for arg in args if arg.isdigit()]
+    outputs = [arg for arg in args if arg not in spec_files and not arg.isdigit()]
+    if spec_files:
+        with open(spec_files[0]) as file:
+            spec = json.load(file)
+    else:
+        spec = DATA_CSV_STUDY
+    output = outputs[0] if outputs else 'data_sweep.csv'
+    written, simulated = run_sweep(spec, output, max_workers=workers[0] if workers else None)
+    print(f"Simulated {simulated} work units; wrote {written} rows to {output}")
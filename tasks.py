@@ -4,6 +4,10 @@ import itertools
 import simpy
 import random
 import matplotlib.pyplot as plt
+import engine
+import optimal
+from taskstore import TaskStore, engine_columns
+from cache import ResultCache
 
 class Task:
     def __init__(self, task_id, completion_time, arrival_time):
@@ -26,6 +30,12 @@ def generate_tasks(num_tasks, mean, std_dev):
     
     return tasks
 
+def generate_task_stores(num_simulations, num_tasks, mean, std_dev, rng):
+    # generate_tasks for many replicates at once, drawn as arrays from one Generator
+    durations = np.maximum(rng.normal(mean, std_dev, (num_simulations, num_tasks)).astype(int), 1)
+    arrival_times = rng.integers(0, mean * 2, (num_simulations, num_tasks), endpoint=True)
+    return [TaskStore.from_arrays(arrival_times[sim], durations[sim]) for sim in range(num_simulations)]
+
 # Compute total turnaround time for the set of "n" tasks
 
 def compute_total_time(env, tasks):
@@ -67,236 +77,111 @@ def find_minimum_total_time(tasks):
 
     return min_total_time, min_permutation
 
-def fcfs(env, tasks):
-    machine = simpy.Resource(env, capacity=1)
-    total_times = []
-    fcfs_order = []  
-    total_turnaround_time = 0
-    total_burst_time = 0
-    total_waiting_time = 0
-
-    def task_process(env, task, machine, fcfs_order):  # Add fcfs_order as an argument
-        nonlocal total_turnaround_time, total_burst_time, total_waiting_time
-        yield env.timeout(task.arrival_time)
-        with machine.request() as request:
-            arrival_time = env.now  # Record the time when the task enters the queue
-            yield request
-            yield env.timeout(task.completion_time)
-            total_time = env.now - arrival_time  # Calculate the total time spent in the system
-            total_times.append(total_time)
-            fcfs_order.append(task.task_id)  # Append task_id to fcfs_order
-            total_turnaround_time += total_time
-            total_burst_time += task.completion_time
-            total_waiting_time += total_time - task.completion_time  # Calculate the waiting time as the difference between total time and burst time
-
+def find_minimum_total_time_exact(tasks):
+    arrivals, durations = engine_columns(tasks)
+    min_total_time, order = optimal.optimal_sequence(arrivals, durations)
+    return min_total_time, tuple(tasks[i] for i in order)
+
+def run_discipline(tasks, discipline, machines=1, time_slice=1, switch_overhead=0):
+    # Every discipline runs on the shared k-machine event engine
+    arrivals, durations = engine_columns(tasks)
+    _, ends, order = engine.simulate(arrivals, durations, discipline, time_slice, switch_overhead, machines)
+    total_turnaround_time, total_burst_time, total_waiting_time = engine.totals(arrivals, durations, ends)
+    return total_turnaround_time, total_burst_time, total_waiting_time, [tasks[i].task_id for i in order]
+
+def fcfs(env, tasks, machines=1):
+    # env is kept for call compatibility; the engine keeps its own clock
+    return run_discipline(tasks, 'FCFS', machines)
+
+def sjf(env, tasks, machines=1):
+    return run_discipline(tasks, 'SJF', machines)
+
+def rr(env, tasks, time_slice, switch_overhead=0, machines=1):
+    # FIFO ready queue, one O(1) dispatch per quantum. switch_overhead is
+    # charged whenever a machine changes task.
+    return run_discipline(tasks, 'RR', machines, time_slice, switch_overhead)
+
+def srtn(env, tasks, machines=1):
+    # Preemptive: the clock jumps between arrivals and completions, so
+    # durations may be fractional
+    return run_discipline(tasks, 'SRTN', machines)
+
+def hrrn(env, tasks, machines=1):
+    # Non-preemptive: ratios are only compared when a machine frees up
+    return run_discipline(tasks, 'HRRN', machines)
+
+
+@st.cache_resource
+def get_result_cache():
+    # Shared across reruns, so a slider change only recomputes the disciplines that read it
+    return ResultCache(maxsize=256)
+
+def main():
+    st.title('Task Scheduling Algorithms Comparison')
+
+    st.sidebar.header('Input Parameters')
+    num_tasks = st.sidebar.slider('Number of Tasks', 1, 20, 5)
+    mean_duration = st.sidebar.slider('Mean Task Duration', 1, 10, 5)
+    std_dev_duration = st.sidebar.slider('Standard Deviation of Task Duration', 1, 5, 2)
+    num_machines = st.sidebar.slider('Number of Machines', 1, 50, 1)
+    time_slice = st.sidebar.slider('Time Slice for Round Robin', 1, 10, 3)
+    switch_overhead = st.sidebar.slider('Context Switch Overhead for Round Robin', 0.0, 2.0, 0.0, 0.1)
+    seed = st.sidebar.number_input('Random Seed', min_value=0, value=0)
+
+    np.random.seed(seed)
+    random.seed(seed)
+    tasks = generate_tasks(num_tasks, mean_duration, std_dev_duration)
+    task_set = (seed, num_tasks, mean_duration, std_dev_duration)
+    params = {'machines': num_machines, 'time_slice': time_slice, 'switch_overhead': switch_overhead}
+    result_cache = get_result_cache()
+
+    st.subheader('Generated Tasks')
     for task in tasks:
-        env.process(task_process(env, task, machine, fcfs_order))
-
-    env.run()
-    return total_turnaround_time, total_burst_time, total_waiting_time, fcfs_order
-
-def sjf(env, tasks):
-    machine = simpy.Resource(env, capacity=1)
-    total_times = []
-    sjf_order = []
-    total_turnaround_time = 0
-    total_burst_time = 0
-    total_waiting_time = 0
-    sorted_tasks = sorted(tasks, key=lambda task: (task.arrival_time, task.completion_time))
-
-    def task_process(env, task, machine, sjf_order):
-        nonlocal total_turnaround_time, total_burst_time, total_waiting_time
-        yield env.timeout(task.arrival_time)
-        with machine.request() as request:
-            arrival_time = env.now  # Record the time when the task enters the queue
-            yield request
-            yield env.timeout(task.completion_time)
-            total_time = env.now - arrival_time  # Calculate the total time spent in the system
-            total_times.append(total_time)
-            sjf_order.append(task.task_id)
-            total_turnaround_time += total_time
-            total_burst_time += task.completion_time
-            total_waiting_time += total_time - task.completion_time  # Calculate the waiting time as the difference between total time and burst time
-
-    for task in sorted_tasks:
-        env.process(task_process(env, task, machine, sjf_order))
-
-    env.run()
-    return total_turnaround_time, total_burst_time, total_waiting_time, sjf_order
-
-def rr(env, tasks, time_slice):
-    machine = simpy.Resource(env, capacity=1)
-    total_times = []
-    rr_order = []
-    total_turnaround_time = 0
-    total_burst_time = 0
-    total_waiting_time = 0
-    remaining_times = {task.task_id: task.completion_time for task in tasks}
-    task_queue = sorted(tasks, key=lambda task: task.arrival_time)
-
-    def task_process(env, task, machine, time_slice, rr_order):
-        nonlocal total_turnaround_time, total_burst_time, total_waiting_time
-        while remaining_times[task.task_id] > 0:
-            with machine.request() as request:
-                yield env.timeout(task.arrival_time - env.now) if env.now < task.arrival_time else env.timeout(0)
-                yield request
-                run_time = min(time_slice, remaining_times[task.task_id])
-                yield env.timeout(run_time)
-                remaining_times[task.task_id] -= run_time
-                if remaining_times[task.task_id] <= 0:
-                    total_time = env.now - task.arrival_time
-                    total_times.append(total_time)
-                    rr_order.append(task.task_id)
-                    total_turnaround_time += total_time
-                    total_burst_time += task.completion_time
-                    total_waiting_time += total_time - task.completion_time  # Calculate the waiting time as the difference between total time and burst time
-                    if task in task_queue:
-                        task_queue.remove(task)
-
-    while task_queue:
-        for task in list(task_queue):
-            env.process(task_process(env, task, machine, time_slice, rr_order))
-            env.run(until=env.now + time_slice)
-
-    return total_turnaround_time, total_burst_time, total_waiting_time, rr_order
-
-def srtn(env, tasks):
-    machine = simpy.Resource(env, capacity=1)
-    total_times = []
-    srtn_order = []
-    total_turnaround_time = 0
-    total_burst_time = 0
-    total_waiting_time = 0
-    remaining_times = {task.task_id: task.completion_time for task in tasks}
-    task_queue = sorted(tasks, key=lambda task: task.arrival_time)
-
-    def task_process(env, task, machine, srtn_order):
-        nonlocal total_turnaround_time, total_burst_time, total_waiting_time
-        while remaining_times[task.task_id] > 0:
-            with machine.request() as request:
-                yield env.timeout(task.arrival_time - env.now) if env.now < task.arrival_time else env.timeout(0)
-                yield request
-                run_time = min(1, remaining_times[task.task_id])
-                yield env.timeout(run_time)
-                remaining_times[task.task_id] -= run_time
-                if remaining_times[task.task_id] <= 0:
-                    total_time = env.now - task.arrival_time
-                    total_times.append(total_time)
-                    srtn_order.append(task.task_id)
-                    total_turnaround_time += total_time
-                    total_burst_time += task.completion_time
-                    total_waiting_time += total_time - task.completion_time  # Calculate the waiting time as the difference between total time and burst time
-                    if task in task_queue:
-                        task_queue.remove(task)
-
-    while task_queue:
-        task_queue.sort(key=lambda t: remaining_times[t.task_id])
-        env.process(task_process(env, task_queue[0], machine, srtn_order))
-        env.run(until=env.now + 1)
-
-    return total_turnaround_time, total_burst_time, total_waiting_time, srtn_order
-
-def hrrn(env, tasks):
-    machine = simpy.Resource(env, capacity=1)
-    total_times = []
-    hrrn_order = []
-    total_turnaround_time = 0
-    total_burst_time = 0
-    total_waiting_time = 0
-    remaining_times = {task.task_id: task.completion_time for task in tasks}
-    arrival_times = {task.task_id: task.arrival_time for task in tasks}
-    task_queue = sorted(tasks, key=lambda task: task.arrival_time)
-
-    def task_process(env, task, machine, hrrn_order):
-        nonlocal total_turnaround_time, total_burst_time, total_waiting_time
-        yield env.timeout(task.arrival_time)
-        while remaining_times[task.task_id] > 0:
-            with machine.request() as request:
-                yield request
-                run_time = remaining_times[task.task_id]
-                yield env.timeout(run_time)
-                remaining_times[task.task_id] -= run_time
-                if remaining_times[task.task_id] <= 0:
-                    total_time = env.now - arrival_times[task.task_id]
-                    total_times.append(total_time)
-                    hrrn_order.append(task.task_id)
-                    total_turnaround_time += total_time
-                    total_burst_time += task.completion_time
-                    total_waiting_time += total_time - task.completion_time
-                    break
-
-    while task_queue:
-        available_tasks = [task for task in task_queue if task.arrival_time <= env.now]
-        if available_tasks:
-            hrrn = [(task, ((env.now - task.arrival_time + remaining_times[task.task_id]) / remaining_times[task.task_id])) for task in available_tasks]
-            task_queue.sort(key=lambda t: hrrn[available_tasks.index(t)][1], reverse=True)
-            env.process(task_process(env, task_queue[0], machine, hrrn_order))
-            task_queue.pop(0)
-        env.run(until=env.now + 1)
-
-    return total_turnaround_time, total_burst_time, total_waiting_time, hrrn_order
-
-
-st.title('Task Scheduling Algorithms Comparison')
-
-st.sidebar.header('Input Parameters')
-num_tasks = st.sidebar.slider('Number of Tasks', 1, 20, 5)
-mean_duration = st.sidebar.slider('Mean Task Duration', 1, 10, 5)
-std_dev_duration = st.sidebar.slider('Standard Deviation of Task Duration', 1, 5, 2)
-time_slice = st.sidebar.slider('Time Slice for Round Robin', 1, 10, 3)
-
-tasks = generate_tasks(num_tasks, mean_duration, std_dev_duration)
-
-st.subheader('Generated Tasks')
-for task in tasks:
-    st.write(task)
-
-env = simpy.Environment()
-fcfs_total_time, fcfs_burst_time, fcfs_waiting_time, fcfs_order = fcfs(env, tasks)
-env = simpy.Environment()
-sjf_total_time, sjf_burst_time, sjf_waiting_time, sjf_order = sjf(env, tasks)
-env = simpy.Environment()
-rr_total_time, rr_burst_time, rr_waiting_time, rr_order = rr(env, tasks, time_slice)
-env = simpy.Environment()
-srtn_total_time, srtn_burst_time, srtn_waiting_time, srtn_order = srtn(env, tasks)
-env = simpy.Environment()
-hrrn_total_time, hrrn_burst_time, hrrn_waiting_time, hrrn_order = hrrn(env, tasks)
-
-# For optimal permutation (exponential complexity), we limit to smaller tasks
-if num_tasks <= 6:
-    min_total_time, min_permutation = find_minimum_total_time(tasks)
-    st.subheader('Optimal Permutation')
-    st.write(' -> '.join([str(task.task_id) for task in min_permutation]))
-    st.write(f'Total Turnaround Time: {min_total_time}')
-else:
-    min_total_time = None
-
-st.subheader('First-Come, First-Served (FCFS)')
-st.write('Order:', ' -> '.join(map(str, fcfs_order)))
-st.write(f'Total Turnaround Time: {fcfs_total_time}, Total Burst Time: {fcfs_burst_time}, Total Waiting Time: {fcfs_waiting_time}')
-
-st.subheader('Shortest Job First (SJF)')
-st.write('Order:', ' -> '.join(map(str, sjf_order)))
-st.write(f'Total Turnaround Time: {sjf_total_time}, Total Burst Time: {sjf_burst_time}, Total Waiting Time: {sjf_waiting_time}')
-
-st.subheader('Round Robin (RR)')
-st.write('Order:', ' -> '.join(map(str, rr_order)))
-st.write(f'Total Turnaround Time: {rr_total_time}, Total Burst Time: {rr_burst_time}, Total Waiting Time: {rr_waiting_time}')
-
-st.subheader('Shortest Remaining Time Next (SRTN)')
-st.write('Order:', ' -> '.join(map(str, srtn_order)))
-st.write(f'Total Turnaround Time: {srtn_total_time}, Total Burst Time: {srtn_burst_time}, Total Waiting Time: {srtn_waiting_time}')
-
-st.subheader('Highest Response Ratio Next (HRRN)')
-st.write('Order:', ' -> '.join(map(str, hrrn_order)))
-st.write(f'Total Turnaround Time: {hrrn_total_time}, Total Burst Time: {hrrn_burst_time}, Total Waiting Time: {hrrn_waiting_time}')
-
-# Plot the comparison
-labels = ['FCFS', 'SJF', 'RR', 'SRTN', 'HRRN']
-times = [fcfs_total_time, sjf_total_time, rr_total_time, srtn_total_time, hrrn_total_time]
-
-fig, ax = plt.subplots()
-ax.bar(labels, times, color=['blue', 'orange', 'green', 'red', 'purple'])
-ax.set_ylabel('Total Turnaround Time')
-ax.set_title('Comparison of Scheduling Algorithms')
-st.pyplot(fig)
+        st.write(task)
+
+    fcfs_total_time, fcfs_burst_time, fcfs_waiting_time, fcfs_order = result_cache.get_or_compute(task_set, 'FCFS', params, lambda: fcfs(simpy.Environment(), tasks, num_machines))
+    sjf_total_time, sjf_burst_time, sjf_waiting_time, sjf_order = result_cache.get_or_compute(task_set, 'SJF', params, lambda: sjf(simpy.Environment(), tasks, num_machines))
+    rr_total_time, rr_burst_time, rr_waiting_time, rr_order = result_cache.get_or_compute(task_set, 'RR', params, lambda: rr(simpy.Environment(), tasks, time_slice, switch_overhead, num_machines))
+    srtn_total_time, srtn_burst_time, srtn_waiting_time, srtn_order = result_cache.get_or_compute(task_set, 'SRTN', params, lambda: srtn(simpy.Environment(), tasks, num_machines))
+    hrrn_total_time, hrrn_burst_time, hrrn_waiting_time, hrrn_order = result_cache.get_or_compute(task_set, 'HRRN', params, lambda: hrrn(simpy.Environment(), tasks, num_machines))
+
+    # Branch-and-bound keeps the optimal permutation interactive for every slider value.
+    # The sequencing problem it solves is single-machine only.
+    if num_machines == 1:
+        min_total_time, min_permutation = result_cache.get_or_compute(task_set, 'Optimal', params, lambda: find_minimum_total_time_exact(tasks))
+        st.subheader('Optimal Permutation')
+        st.write(' -> '.join([str(task.task_id) for task in min_permutation]))
+        st.write(f'Total Turnaround Time: {min_total_time}')
+
+    st.subheader('First-Come, First-Served (FCFS)')
+    st.write('Order:', ' -> '.join(map(str, fcfs_order)))
+    st.write(f'Total Turnaround Time: {fcfs_total_time}, Total Burst Time: {fcfs_burst_time}, Total Waiting Time: {fcfs_waiting_time}')
+
+    st.subheader('Shortest Job First (SJF)')
+    st.write('Order:', ' -> '.join(map(str, sjf_order)))
+    st.write(f'Total Turnaround Time: {sjf_total_time}, Total Burst Time: {sjf_burst_time}, Total Waiting Time: {sjf_waiting_time}')
+
+    st.subheader('Round Robin (RR)')
+    st.write('Order:', ' -> '.join(map(str, rr_order)))
+    st.write(f'Total Turnaround Time: {rr_total_time}, Total Burst Time: {rr_burst_time}, Total Waiting Time: {rr_waiting_time}')
+
+    st.subheader('Shortest Remaining Time Next (SRTN)')
+    st.write('Order:', ' -> '.join(map(str, srtn_order)))
+    st.write(f'Total Turnaround Time: {srtn_total_time}, Total Burst Time: {srtn_burst_time}, Total Waiting Time: {srtn_waiting_time}')
+
+    st.subheader('Highest Response Ratio Next (HRRN)')
+    st.write('Order:', ' -> '.join(map(str, hrrn_order)))
+    st.write(f'Total Turnaround Time: {hrrn_total_time}, Total Burst Time: {hrrn_burst_time}, Total Waiting Time: {hrrn_waiting_time}')
+
+    # Plot the comparison
+    labels = ['FCFS', 'SJF', 'RR', 'SRTN', 'HRRN']
+    times = [fcfs_total_time, sjf_total_time, rr_total_time, srtn_total_time, hrrn_total_time]
+
+    fig, ax = plt.subplots()
+    ax.bar(labels, times, color=['blue', 'orange', 'green', 'red', 'purple'])
+    ax.set_ylabel('Total Turnaround Time')
+    ax.set_title('Comparison of Scheduling Algorithms')
+    st.pyplot(fig)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import numpy as np
+
+# Structure-of-arrays task storage. Each field is one NumPy column, so a
+# million tasks cost a few dozen bytes each and the engines read arrivals and
+# durations straight from the arrays. TaskView is a two-slot handle onto one row
+# that answers to the attribute names the Task / WashTask / WashingTask classes
+# use, so code written against those objects keeps working on a store.
+
+WASH_TYPES = ['regular', 'quick', 'normal', 'heavy']
+FABRIC_TYPES = ['cotton', 'polyester', 'silk']
+
+COLUMNS = {
+    'id': np.int64,
+    'arrival': np.float64,
+    'duration': np.float64,
+    'weight': np.float64,
+    'wash_type': np.int8,  # Index into WASH_TYPES
+    'fabric_type': np.int8,  # Index into FABRIC_TYPES
+    'start': np.float64,
+    'end': np.float64,
+}
+
+
+class TaskStore:
+    def __init__(self, size, **columns):
+        # Given columns already of the right dtype are used as they are, not copied
+        for name, dtype in COLUMNS.items():
+            values = columns.get(name)
+            setattr(self, name, np.zeros(size, dtype=dtype) if values is None else np.asarray(values, dtype=dtype))
+        if columns.get('id') is None:
+            self.id = np.arange(1, size + 1, dtype=COLUMNS['id'])
+
+    @classmethod
+    def from_arrays(cls, arrivals, durations, weights=None, wash_types=None, fabric_types=None, ids=None):
+        return cls(len(arrivals), id=ids, arrival=arrivals, duration=durations, weight=weights, wash_type=wash_types, fabric_type=fabric_types)
+
+    @classmethod
+    def from_tasks(cls, tasks):
+        # Accepts any of the task classes; fields a class lacks stay zero
+        store = cls(len(tasks))
+        for i, task in enumerate(tasks):
+            store.id[i] = getattr(task, 'task_id', getattr(task, 'user_id', i + 1))
+            store.arrival[i] = task.arrival_time
+            store.duration[i] = task.wash_duration if hasattr(task, 'wash_duration') else task.completion_time
+            store.weight[i] = getattr(task, 'weight', getattr(task, 'washing_weight', 0))
+            if hasattr(task, 'wash_type'):
+                store.wash_type[i] = WASH_TYPES.index(task.wash_type)
+            if hasattr(task, 'fabric_type'):
+                store.fabric_type[i] = FABRIC_TYPES.index(task.fabric_type)
+            store.start[i] = getattr(task, 'start_time', 0)
+            store.end[i] = getattr(task, 'end_time', 0)
+        return store
+
+    def __len__(self):
+        return len(self.id)
+
+    def __getitem__(self, index):
+        return TaskView(self, index)
+
+    def __iter__(self):
+        return (TaskView(self, i) for i in range(len(self)))
+
+    def copy(self):
+        return TaskStore(len(self), **{name: getattr(self, name).copy() for name in COLUMNS})
+
+    def records(self):
+        # Detached plain copies of the rows, for SimPy code that reads task
+        # attributes on every event and would pay for each view lookup
+        columns = [getattr(self, name).tolist() for name in COLUMNS]
+        return [TaskRecord(*row) for row in zip(*columns)]
+
+
+def column(name):
+    def get(view):
+        return getattr(view.store, name).item(view.index)  # A Python scalar without an interim NumPy one
+
+    def set(view, value):
+        getattr(view.store, name)[view.index] = value
+
+    return property(get, set)
+
+
+def coded_column(name, labels):
+    def get(view):
+        return labels[getattr(view.store, name).item(view.index)]
+
+    def set(view, value):
+        getattr(view.store, name)[view.index] = labels.index(value)
+
+    return property(get, set)
+
+
+class TaskView:
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    task_id = user_id = column('id')
+    arrival_time = column('arrival')
+    completion_time = wash_duration = column('duration')
+    weight = washing_weight = column('weight')
+    wash_type = coded_column('wash_type', WASH_TYPES)
+    fabric_type = coded_column('fabric_type', FABRIC_TYPES)
+    start_time = column('start')
+    end_time = column('end')
+
+    def __repr__(self):
+        return f"Task {self.task_id} (Arrival: {self.arrival_time}, Duration: {self.completion_time})"
+
+
+class TaskRecord:
+    __slots__ = ('task_id', 'user_id', 'arrival_time', 'completion_time', 'wash_duration', 'weight', 'washing_weight', 'wash_type', 'fabric_type', 'start_time', 'end_time')
+
+    def __init__(self, id, arrival, duration, weight, wash_type, fabric_type, start, end):
+        self.task_id = self.user_id = id
+        self.arrival_time = arrival
+        self.completion_time = self.wash_duration = duration
+        self.weight = self.washing_weight = weight
+        self.wash_type = WASH_TYPES[wash_type]
+        self.fabric_type = FABRIC_TYPES[fabric_type]
+        self.start_time = start
+        self.end_time = end
+
+    def __repr__(self):
+        return f"Task {self.task_id} (Arrival: {self.arrival_time}, Duration: {self.completion_time})"
+
+
+def engine_columns(tasks):
+    # (arrivals, durations) for the engine: straight from the arrays for a
+    # store, one pass over the objects otherwise
+    if isinstance(tasks, TaskStore):
+        return tasks.arrival.tolist(), tasks.duration.tolist()
+    return [task.arrival_time for task in tasks], [task.completion_time for task in tasks]
@@ -0,0 +1,78 @@
+import math
+import numpy as np
+from scipy import special
+
+# Variance reduction for discipline comparisons. Every discipline in a replicate
+# runs the same task set (common random numbers), so paired differences cancel
+# the noise the disciplines share. Antithetic replicates come in twins: the
+# second twin is drawn from the same seed with 1 - U wherever the first drew U.
+# The reduction factors below say how many independent, unpaired replicates
+# would match the precision of one replicate of this design.
+
+
+class InverseTransformGenerator:
+    # Stands in for a numpy Generator in the task generators. Every variate is
+    # one uniform pushed through an inverse CDF, so twins stay in step draw by draw.
+    def __init__(self, rng, antithetic=False):
+        self.rng = rng
+        self.antithetic = antithetic
+
+    def random(self, size=None):
+        # Uniforms on the open interval, on a grid that 1 - U maps onto itself exactly
+        k = self.rng.integers(0, 2**52, size)
+        if self.antithetic:
+            k = 2**52 - 1 - k
+        return (k + 0.5) / 2**52
+
+    def standard_normal(self, size=None):
+        return special.ndtri(self.random(size))
+
+    def normal(self, loc=0.0, scale=1.0, size=None):
+        return loc + scale * self.standard_normal(size)
+
+    def exponential(self, scale=1.0, size=None):
+        return -scale * np.log1p(-self.random(size))
+
+    def integers(self, low, high=None, size=None, dtype=np.int64, endpoint=False):
+        if high is None:
+            low, high = 0, low
+        if endpoint:
+            high += 1
+        return np.asarray(low + np.floor(self.random(size) * (high - low))).astype(dtype)[()]
+
+
+def antithetic_pairs(generate, count, rng):
+    # generate(n, rng) draws n replicates; replicate 2k + 1 is the antithetic twin of 2k
+    seed = rng.integers(2**63)
+    halves = [generate((count + 1) // 2, InverseTransformGenerator(np.random.default_rng(seed), antithetic)) for antithetic in (False, True)]
+    return [replicate for pair in zip(*halves) for replicate in pair][:count]
+
+
+def efficiency(values, independent_variance, antithetic=False):
+    # Independent-sampling variance over this design's variance, per replicate.
+    # With antithetic twins the pair means are the independent observations.
+    values = np.asarray(values, dtype=np.float64)
+    if antithetic:
+        pair_means = values[:len(values) // 2 * 2].reshape(-1, 2).mean(axis=1)
+        if len(pair_means) < 2:
+            return math.nan
+        design_variance = 2 * pair_means.var(ddof=1)
+    else:
+        if len(values) < 2:
+            return math.nan
+        design_variance = values.var(ddof=1)
+    if design_variance == 0:
+        return math.inf if independent_variance > 0 else 1.0
+    return independent_variance / design_variance
+
+
+def reduction_factors(observations, names, antithetic=False):
+    # observations: one {discipline: value} per replicate, in replicate order
+    values = {name: np.array([o[name] for o in observations], dtype=np.float64) for name in names}
+    variances = {name: v.var(ddof=1) if len(v) > 1 else math.nan for name, v in values.items()}
+    factors = {name: efficiency(values[name], variances[name], antithetic) for name in names}
+    for i, a in enumerate(names):
+        for b in names[i + 1:]:
+            # Unpaired sampling would add the two variances instead of cancelling their covariance
+            factors[f'{a} - {b}'] = efficiency(values[a] - values[b], variances[a] + variances[b], antithetic)
+    return factors